@@ -1,7 +1,8 @@
 import streamlit as st, pandas as pd
 from utils.rbac import allow_roles
-from utils.models import list_students_in_course, upsert_score, get_scores,add_notification,get_user_id_by_email
+from utils.models import course_gradebook, upsert_scores, get_scores
 from utils.db import get_conn
+from utils import importer
 
 @allow_roles("lecturer","student")
 def main():
@@ -32,24 +33,66 @@ def main():
         label = col1.selectbox("Course", [f"{m['code']} - {m['title']}" for m in mine])
         chosen = [m for m in mine if f"{m['code']} - {m['title']}"==label][0]
         component = col2.selectbox("Component", ["Test","Assignment","Exam"])
-        students = list_students_in_course(chosen["course_id"], session, semester)
+        gradebook = course_gradebook(chosen["course_id"], session, semester, component.lower())
         st.divider()
         
         st.subheader("Enter Scores")
-        if students:
-            with st.expander(f"Record Scores for {chosen["code"]} {component}"):
-                for s in students:
-                    user_id = get_user_id_by_email(s["email"])
-                    score = st.number_input(f"{s['full_name']}", 0.0, 100.0, 0.0, step=1.0, key=f"sc_{user_id}")
-                    if st.button(f"Save Score", key=f"save_sc_{user_id}"):
-                        upsert_score(chosen["course_id"], user_id, component.lower(), score, u["id"])
-                        add_notification(
-                            title=f"New scores posted for {chosen['code']}",
-                            message=f"Scores for {component} were posted. Check your dashboard.",
-                            course_id=chosen["course_id"]
-                        )
+        if gradebook:
+            original = pd.DataFrame(
+                [(g["student_id"], g["full_name"], g["matric_no"], g["score"]) for g in gradebook],
+                columns=["student_id", "Student", "Matric No", "Score"],
+            ).set_index("student_id")
+            original["Score"] = original["Score"].astype(float)
 
-                        st.success("Saved.")
+            # the form keeps edits client-side until Save, so typing doesn't rerun the page
+            with st.form(f"gradebook_{chosen['course_id']}_{component}"):
+                st.caption(f"Gradebook for {chosen['code']} {component} — edit any cells, then save once.")
+                edited = st.data_editor(
+                    original,
+                    hide_index=True,
+                    use_container_width=True,
+                    disabled=["Student", "Matric No"],
+                    column_config={"Score": st.column_config.NumberColumn(min_value=0.0, max_value=100.0, step=1.0)},
+                )
+                submitted = st.form_submit_button("💾 Save Scores")
+
+            if submitted:
+                new_scores = edited["Score"]
+                changed = new_scores.notna() & (new_scores != original["Score"])
+                updates = {int(sid): float(v) for sid, v in new_scores[changed].items()}
+                if updates:
+                    n = upsert_scores(
+                        chosen["course_id"], component.lower(), updates, u["id"],
+                        notify_title=f"New scores posted for {chosen['code']}",
+                        notify_message=f"Scores for {component} were posted. Check your dashboard.",
+                    )
+                    st.success(f"✅ Saved {n} score(s).")
+                else:
+                    st.info("No changes to save.")
+        else:
+            st.info(f"No students enrolled in {chosen['code']} yet.")
+
+        with st.expander("📤 Import Scores (CSV / Excel)"):
+            st.caption("Columns: matric_no, course_code, component (test/assignment/exam), score, optional attempt.")
+            st.download_button("⬇️ Template", importer.template_csv("scores"),
+                               file_name="scores_template.csv", mime="text/csv")
+            upload = st.file_uploader("Result sheet", type=["csv", "xlsx"], key="score_import")
+            if upload is not None and st.button("📥 Import Scores"):
+                try:
+                    with st.spinner("Importing..."):
+                        report = importer.import_scores(
+                            upload, u["id"], session, semester,
+                            allowed_course_ids=[m["course_id"] for m in mine])
+                except ValueError as e:
+                    st.error(f"❌ {e}")
+                else:
+                    st.success(f"✅ {report.written} of {report.rows} row(s) imported.")
+                    if report.failed:
+                        st.warning(f"⚠️ {report.failed} row(s) rejected.")
+                        errors = report.error_frame()
+                        st.dataframe(errors, use_container_width=True)
+                        st.download_button("⬇️ Error Report (CSV)", errors.to_csv(index=False),
+                                           file_name="score_import_errors.csv", mime="text/csv")
         st.divider()
     else:
         # students will view scores in dashboard
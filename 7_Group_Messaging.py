@@ -1,6 +1,48 @@
 import streamlit as st
 from utils.rbac import allow_roles
 from utils.db import get_conn
+from utils.models import send_message, get_messages_after, get_messages_before
+
+PAGE_SIZE = 50   # messages per "Load older" page
+POLL_SECS = 5    # how often an open thread checks for new messages
+POLL_BATCH = 200
+
+
+def thread_buffer(course_id):
+    """This session's copy of a course thread (oldest first), filled page by page."""
+    threads = st.session_state.setdefault("chat_threads", {})
+    if course_id not in threads:
+        msgs = get_messages_before(course_id, limit=PAGE_SIZE)
+        threads[course_id] = {"msgs": msgs, "has_older": len(msgs) == PAGE_SIZE}
+    return threads[course_id]
+
+
+@st.fragment(run_every=POLL_SECS)
+def show_thread(course_id, user_id):
+    """Append messages newer than the buffer's last id; older ones load on demand."""
+    thread = thread_buffer(course_id)
+    while True:
+        after = thread["msgs"][-1]["id"] if thread["msgs"] else 0
+        new = get_messages_after(course_id, after, limit=POLL_BATCH)
+        thread["msgs"].extend(new)
+        if len(new) < POLL_BATCH:
+            break
+
+    st.subheader("💬 Thread")
+    if not thread["msgs"]:
+        st.info("No messages yet for this course.")
+        return
+    for m in reversed(thread["msgs"]):
+        with st.chat_message("user" if m["sender_id"] == user_id else m["full_name"]):
+            st.caption(f"**{m['full_name']}** · {m['created_at']}")
+            st.markdown(m["body"])
+
+    if thread["has_older"] and st.button("⬆️ Load older messages"):
+        older = get_messages_before(course_id, thread["msgs"][0]["id"], limit=PAGE_SIZE)
+        thread["msgs"][:0] = older
+        thread["has_older"] = len(older) == PAGE_SIZE
+        st.rerun(scope="fragment")
+
 
 @allow_roles("student", "lecturer","admin")
 def main():
@@ -40,11 +82,7 @@ def main():
         if not body:
             st.warning("Message cannot be empty.")
         else:
-            with get_conn() as conn:
-                conn.execute(
-                    "INSERT INTO messages (sender_id, course_id, body) VALUES (?,?,?)",
-                    (u["id"], course_id, body),
-                )
+            send_message(u["id"], course_id, body)
             # rotate the key so the input is recreated empty on next run
             st.session_state.msg_nonce += 1
             st.success("Message sent!")
@@ -52,27 +90,9 @@ def main():
     if confirm:
         st.rerun()
 
-    # --- display thread
-    with get_conn() as conn:
-        msgs = conn.execute(
-            """
-            SELECT m.body, m.created_at, u.full_name
-            FROM messages m
-            JOIN users u ON u.id = m.sender_id
-            WHERE m.course_id=?
-            ORDER BY m.created_at DESC
-            """,
-            (course_id,),
-        ).fetchall()
-
+    # --- display thread (polls for new messages on its own, see show_thread)
     st.divider()
-    st.subheader("💬 Thread")
-    if not msgs:
-        st.info("No messages yet for this course.")
-    else:
-        for m in msgs:
-            with st.expander(f"**{m['full_name']}** ({m['created_at']})"):
-                st.markdown(f"**{m['full_name']}**: {m['body']}")
+    show_thread(course_id, u["id"])
     st.divider()
 
 if __name__ == "__main__":
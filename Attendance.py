@@ -1,7 +1,12 @@
 import streamlit as st, pandas as pd, datetime
 from utils.rbac import allow_roles
-from utils.models import list_students_in_course, mark_attendance, get_attendance, attendance_summary, add_notification,get_user_id_by_email
+from utils.models import (
+    list_students_in_course, mark_attendance_bulk, get_attendance, attendance_summary,
+    course_attendance_matrix
+)
 from utils.db import get_conn
+from utils import importer
+from utils.outbox import notify
 
 @allow_roles("lecturer","student")
 def main():
@@ -51,12 +56,14 @@ def main():
             st.subheader(f"Students who enrolled for {chosen['code']}")
             if students:
                 st.write("Mark presence:")
+                register = {}
                 for s in students:
-                    user_id = get_user_id_by_email(s["email"])
-                    present = st.checkbox(s["full_name"], value=True, key=f"att_{user_id}")
-                if st.button(f"Save Attendance", key=f"save_{user_id}"):
-                    mark_attendance(chosen["course_id"], user_id, class_date, present, u["id"])
-                    add_notification(
+                    register[s["id"]] = st.checkbox(s["full_name"], value=True, key=f"att_{s['id']}")
+                if st.button(f"Save Attendance", key=f"save_att_{chosen['course_id']}"):
+                    # one transaction for the whole register
+                    mark_attendance_bulk(chosen["course_id"], class_date, register, u["id"])
+                    # queued: re-saves of the register fold into one notification
+                    notify(
                         title=f"Attendance marked for {chosen["code"]}",
                         message=f"Attendance for {class_date} has been recorded.",
                         course_id=chosen["course_id"]
@@ -66,6 +73,28 @@ def main():
                     st.rerun()
             else:
                 st.info(f"No student have enrolled for {chosen['code']}")
+
+        with st.expander("📤 Import Attendance (CSV / Excel)"):
+            st.caption("Columns: matric_no, course_code, class_date, present (1/0, present/absent or yes/no).")
+            st.download_button("⬇️ Template", importer.template_csv("attendance"),
+                               file_name="attendance_template.csv", mime="text/csv")
+            upload = st.file_uploader("Attendance sheet", type=["csv", "xlsx"], key="att_import")
+            if upload is not None and st.button("📥 Import Attendance"):
+                try:
+                    with st.spinner("Importing..."):
+                        report = importer.import_attendance(
+                            upload, u["id"], session, semester,
+                            allowed_course_ids=[m["course_id"] for m in mine])
+                except ValueError as e:
+                    st.error(f"❌ {e}")
+                else:
+                    st.success(f"✅ {report.written} of {report.rows} row(s) imported.")
+                    if report.failed:
+                        st.warning(f"⚠️ {report.failed} row(s) rejected.")
+                        errors = report.error_frame()
+                        st.dataframe(errors, use_container_width=True)
+                        st.download_button("⬇️ Error Report (CSV)", errors.to_csv(index=False),
+                                           file_name="attendance_import_errors.csv", mime="text/csv")
         st.divider()
 
         # 📊 Attendance Summary (% by Students)
@@ -83,51 +112,45 @@ def main():
             if not students:
                 st.warning("⚠️ No students enrolled in this course.")
             else:
-                # 🔹 Attendance % per student
-                summary_rows = []
-                for s in students:
-                    user_id = get_user_id_by_email(s["email"])
-                    summ = attendance_summary(user_id)
-                    # filter to this course only
-                    for rec in summ:
-                        if rec["Course Code"] == chosen["code"]:
-                            summary_rows.append({
-                                "Student": s["full_name"],
-                                "Attendance %": rec["Attendance %"]
-                            })
+                # 🔹 Attendance % per student and per-date register, for the whole course at once
+                matrix = course_attendance_matrix(chosen["course_id"], session, semester)
+                pivot = matrix["pivot"]
+                summary_rows = matrix["summary"]
+                all_records = matrix["records"]
                 st.divider()
                 if summary_rows:
                     df_summary = pd.DataFrame(summary_rows)
                     st.markdown("### 📌 Attendance Percentage by Student")
+                    col1, col2 = st.columns(2)
+                    col1.metric("🗓️ Classes Held", len(pivot.dates))
+                    col2.metric("🚨 Below 75%", len(pivot.at_risk(75)))
                     st.dataframe(df_summary, use_container_width=True)
 
-                    # Download option
-                    st.download_button(
+                    # Download options
+                    col1, col2 = st.columns(2)
+                    col1.download_button(
                         "⬇️ Download Attendance Summary (CSV)",
                         data=df_summary.to_csv(index=False),
                         file_name=f"attendance_summary_{chosen['code']}.csv",
                         mime="text/csv"
                     )
+                    col2.download_button(
+                        "⬇️ Download Full Register (CSV)",
+                        data=pivot.to_frame().to_csv(),
+                        file_name=f"attendance_register_{chosen['code']}.csv",
+                        mime="text/csv"
+                    )
                 else:
                     st.info("No attendance records yet for this course.")
 
                 # 🔹 Detailed attendance by date
                 st.divider()
                 st.markdown("### 📅 Detailed Attendance Records")
-                all_records = []
-                for s in students:
-                    user_id = get_user_id_by_email(s["email"])
-                    recs = get_attendance(user_id)
-                    for r in recs:
-                        if r["Course Code"] == chosen["code"]:
-                            r["Student"] = s["full_name"]
-                            all_records.append(r)
-
                 if all_records:
                     df_detail = pd.DataFrame(all_records)
 
                     # Get available dates for filtering
-                    unique_dates = sorted(df_detail["Class Date"].unique())
+                    unique_dates = list(pivot.dates)
                     chosen_date = st.selectbox("Select Class Date", unique_dates, key="date_summary")
 
                     filtered = df_detail[df_detail["Class Date"] == chosen_date][
@@ -3,15 +3,68 @@ import pandas as pd
 from utils.rbac import allow_roles
 from utils.models import (
     add_notification,
-    get_notifications_for_user,
+    get_notification_feed,
+    mark_all_notifications_read,
+    mark_notification_read,
+    unread_notification_count,
     get_all_notifications,
     list_all_courses,
     list_all_users,
     list_courses_for_lecturer,
-    get_user_matric_by_email,
-    get_user_id_by_email
 )
 
+PAGE_SIZE = 20
+
+
+def render_feed(u):
+    """Filter + newest page of the user's notifications, with "Load more" for older pages."""
+    unread = unread_notification_count(u["id"])
+    col1, col2, col3 = st.columns([2, 1, 1])
+    filt = col1.selectbox("Filter", ["All", "System", "Course", "Personal"], index=0)
+    unread_only = col2.toggle("Unread only", value=True)
+    col3.metric("📬 Unread", unread)
+    if unread and col3.button("✅ Mark all read"):
+        mark_all_notifications_read(u["id"])
+        st.session_state.pop("notification_feed", None)
+        st.rerun()
+
+    # the newest page is re-read every run (one indexed query); pages fetched with
+    # "Load more" are kept in the session, using the last id shown as the keyset cursor
+    feed = st.session_state.get("notification_feed")
+    if feed is None or feed["filter"] != (filt, unread_only):
+        feed = st.session_state["notification_feed"] = {"filter": (filt, unread_only), "loaded": [], "done": False}
+    first = get_notification_feed(u["id"], limit=PAGE_SIZE, kind=filt, unread_only=unread_only)
+    oldest = first[-1]["id"] if first else 0
+    notifs = first + [n for n in feed["loaded"] if n["id"] < oldest]
+    more = len(first) == PAGE_SIZE and not feed["done"]
+
+    if not notifs:
+        st.info("No new notifications." if unread_only else "No notifications.")
+    else:
+        for n in notifs:
+            repeats = f" (×{n['event_count']})" if n["event_count"] > 1 else ""
+            header = f"{'' if n['is_read'] else '🆕 '}{n['title']}{repeats} — {n['created_at'][:19]}"
+            with st.expander(header, expanded=False):
+                if n.get("course_code"):
+                    st.markdown(f"**Course:** `{n['course_code']}`")
+                st.write(n["message"])
+                cols = st.columns([1,1,4])
+                if not n["is_read"] and cols[0].button("Mark read", key=f"read_{n['id']}"):
+                    mark_notification_read(u["id"], n["id"])
+                    st.session_state.pop("notification_feed", None)
+                    st.rerun()
+                if cols[1].button("Save (client)", key=f"save_{n['id']}"):
+                    # optionally let user save to local file
+                    st.download_button(label="Save as .txt", data=n["message"], file_name=f"notification_{n['id']}.txt")
+
+    if more and st.button("⬇️ Load more"):
+        page = get_notification_feed(u["id"], before_id=notifs[-1]["id"], limit=PAGE_SIZE, kind=filt,
+                                     unread_only=unread_only)
+        feed["loaded"] = notifs + page
+        feed["done"] = len(page) < PAGE_SIZE
+        st.rerun()
+
+
 @allow_roles("student", "lecturer", "admin")
 def main():
     st.set_page_config(page_title="EduShield | 🔔 Notifications", page_icon="images/Edushield_Icon1.png", layout="wide")
@@ -24,44 +77,7 @@ def main():
     # ---------- STUDENT VIEW ----------
     if role == "student":
         st.subheader("Your notifications")
-        # in-session "read" list (not persisted)
-        if "seen_notifications" not in st.session_state:
-            st.session_state["seen_notifications"] = []
-
-        # get and optionally filter
-        notifs = get_notifications_for_user(u["id"])
-
-        # Filters
-        filt = st.selectbox("Filter", ["All", "System", "Course", "Personal"], index=0)
-        def keep(n):
-            if filt == "All":
-                return True
-            if filt == "System":
-                return (n.get("course_code") is None) and (n.get("user_id") is None)
-            if filt == "Course":
-                return n.get("course_code") is not None
-            if filt == "Personal":
-                return n.get("user_id") == u["id"]
-            return True
-
-        visible = [n for n in notifs if keep(n) and n["id"] not in st.session_state["seen_notifications"]]
-
-        if not visible:
-            st.info("No new notifications.")
-        else:
-            for n in visible:
-                header = f"{n['title']} — {n['created_at'][:19]}"
-                with st.expander(header, expanded=False):
-                    if n.get("course_code"):
-                        st.markdown(f"**Course:** `{n['course_code']}`")
-                    st.write(n["message"])
-                    cols = st.columns([1,1,4])
-                    if cols[0].button("Mark read", key=f"read_{n['id']}"):
-                        st.session_state["seen_notifications"].append(n["id"])
-                        st.rerun()
-                    if cols[1].button("Save (client)", key=f"save_{n['id']}"):
-                        # optionally let user save to local file
-                        st.download_button(label="Save as .txt", data=n["message"], file_name=f"notification_{n['id']}.txt")
+        render_feed(u)
 
     # ---------- LECTURER / ADMIN VIEW ----------
     else:
@@ -95,11 +111,13 @@ def main():
             if not users:
                 st.info("No users found.")
             else:
-                # matric_no = 
-                choice = st.selectbox("Select user", [f"{u['full_name']} ({u['email']}) ({get_user_matric_by_email(u['email']) if u['role'] == 'student' else u['role'].title()})" for u in users if user_name != u['full_name']])
-                choice = choice.replace(")","").split("(")
-                # st.markdown(choice)
-                user_id = get_user_id_by_email(choice[1])
+                # list_all_users already carries id and matric_no, so no per-user lookups
+                user_map = {
+                    f"{x['full_name']} ({x['email']}) ({x['matric_no'] if x['role'] == 'student' else x['role'].title()})": x["id"]
+                    for x in users if user_name != x['full_name']
+                }
+                choice = st.selectbox("Select user", list(user_map.keys()))
+                user_id = user_map.get(choice)
 
         if st.button("Send Notification"):
             if not title or not message:
@@ -121,43 +139,7 @@ def main():
         #     st.dataframe(df_display, use_container_width=True)
 
         st.subheader("Your notifications")
-        # in-session "read" list (not persisted)
-        if "seen_notifications" not in st.session_state:
-            st.session_state["seen_notifications"] = []
-        # get and optionally filter
-        notifs = get_notifications_for_user(u["id"])
-
-        # Filters
-        filt = st.selectbox("Filter", ["All", "System", "Course", "Personal"], index=0)
-        def keep(n):
-            if filt == "All":
-                return True
-            if filt == "System":
-                return (n.get("course_code") is None) and (n.get("user_id") is None)
-            if filt == "Course":
-                return n.get("course_code") is not None
-            if filt == "Personal":
-                return n.get("user_id") == u["id"]
-            return True
-
-        visible = [n for n in notifs if keep(n) and n["id"] not in st.session_state["seen_notifications"]]
-
-        if not visible:
-            st.info("No new notifications.")
-        else:
-            for n in visible:
-                header = f"{n['title']} — {n['created_at'][:19]}"
-                with st.expander(header, expanded=False):
-                    if n.get("course_code"):
-                        st.markdown(f"**Course:** `{n['course_code']}`")
-                    st.write(n["message"])
-                    cols = st.columns([1,1,4])
-                    if cols[0].button("Mark read", key=f"read_{n['id']}"):
-                        st.session_state["seen_notifications"].append(n["id"])
-                        st.rerun()
-                    if cols[1].button("Save (client)", key=f"save_{n['id']}"):
-                        # optionally let user save to local file
-                        st.download_button(label="Save as .txt", data=n["message"], file_name=f"notification_{n['id']}.txt")
+        render_feed(u)
 
 
     st.divider()
@@ -1,8 +1,8 @@
 import streamlit as st
 import os
-from utils.rbac import allow_roles
+from utils.rbac import allow_roles, current_user
 from utils.models import update_user_info, change_password, update_profile_pic
-from utils.models import get_user_profile
+from utils.auth import LoginBusy
 
 
 UPLOAD_DIR = "profile_picture"
@@ -22,9 +22,8 @@ def profile_page(user,u):
         if not user.get("profile_pic"):
             DEFAULT_AVATAR = "static/default_dp.jpg"
             # If no profile picture uploaded, use default avatar
-            user["profile_pic"] = DEFAULT_AVATAR
             # st.info("No profile picture uploaded")
-            st.image(user["profile_pic"], width=180)
+            st.image(DEFAULT_AVATAR, width=180)
             st.caption("Profile Picture")
         else:
             st.image(user["profile_pic"], width=180)
@@ -57,11 +56,16 @@ def profile_page(user,u):
         new_pw = st.text_input("New Password", type="password")
 
         if st.button("Update Password"):
-            ok, msg = change_password(user["id"], old_pw, new_pw)
-            if ok:
-                st.success(msg)
+            try:
+                # the old password is checked on the shared login pool, which can be full
+                ok, msg = change_password(user["id"], old_pw, new_pw)
+            except LoginBusy as e:
+                st.warning(f"⏳ {e}")
             else:
-                st.error(msg)
+                if ok:
+                    st.success(msg)
+                else:
+                    st.error(msg)
 
     # === Upload profile picture ===
     with tab3:
@@ -86,10 +90,9 @@ def profile_page(user,u):
 def main():
     st.set_page_config(page_title="EduShield | 👤 Profile", page_icon="images/Edushield_Icon1.png", layout="wide")
 
-    u = st.session_state["user"]
-    # Example: assume current user ID = 3 (from session)
-    user_id = u['id']
-    user = get_user_profile(user_id)
+    # cached session record; refreshed automatically after profile updates
+    u = current_user()
+    user = u
 
     if user:
         profile_page(user, u)
@@ -0,0 +1,53 @@
+import streamlit as st
+from utils.rbac import allow_roles
+from utils.models import search, SEARCH_SOURCES
+
+PAGE_SIZE = 20
+ICONS = {"Message": "💬", "Notification": "🔔", "Resource": "📚"}
+
+
+@allow_roles("student", "lecturer", "admin")
+def main():
+    st.set_page_config(page_title="EduShield | 🔎 Search", page_icon="images/Edushield_Icon1.png", layout="wide")
+    st.title("🔎 Search")
+    st.caption("🔎 'Messages, announcements and course materials from your courses.'")
+    st.divider()
+
+    u = st.session_state["user"]
+    col1, col2 = st.columns([3, 2])
+    text = col1.text_input("Search for", placeholder="e.g. quiz recursion")
+    sources = col2.multiselect("In", list(SEARCH_SOURCES), default=list(SEARCH_SOURCES))
+
+    # a new query or source selection starts again from the first page
+    if st.session_state.get("search_key") != (text, tuple(sources)):
+        st.session_state["search_key"] = (text, tuple(sources))
+        st.session_state["search_offset"] = 0
+    offset = st.session_state["search_offset"]
+
+    if not text.strip() or not sources:
+        st.info("Type a word or two to search.")
+        return
+
+    results, has_more = search(u["id"], u["role"], text, sources, limit=PAGE_SIZE, offset=offset)
+    if not results:
+        st.info("No matches.")
+        return
+
+    st.caption(f"Results {offset + 1}–{offset + len(results)}, best match first")
+    for r in results:
+        course = f" · `{r['course_code']}`" if r["course_code"] else ""
+        st.markdown(f"{ICONS[r['source']]} **{r['title']}**{course} · {r['created_at'][:16]}")
+        st.markdown("> " + r["snippet"].replace("\n", " "))
+
+    col1, col2, _ = st.columns([1, 1, 4])
+    if offset and col1.button("⬅️ Previous"):
+        st.session_state["search_offset"] = max(offset - PAGE_SIZE, 0)
+        st.rerun()
+    if has_more and col2.button("Next ➡️"):
+        st.session_state["search_offset"] = offset + PAGE_SIZE
+        st.rerun()
+    st.divider()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import streamlit as st
+import pandas as pd
+from utils.rbac import allow_roles
+from utils import profiler
+
+
+@allow_roles("admin")
+def main():
+    st.set_page_config(page_title="EduShield | 🗂️ System Logs", page_icon="images/Edushield_Icon1.png", layout="wide")
+    st.title("🗂️ System Logs")
+    st.caption("🗂️ 'Query timings for this server process — find the slow and chatty pages.'")
+    st.divider()
+
+    if not profiler.PROFILING:
+        st.info("Query profiling is off. Start the app with EDUSHIELD_QUERY_PROFILING=1 to record query timings.")
+        return
+
+    functions = profiler.function_stats()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("🧮 Queries", sum(f["calls"] for f in functions))
+    col2.metric("⏱️ DB Time", f"{sum(f['ms'] for f in functions) / 1000:.2f}s")
+    col3.metric("🐢 Slow Queries", len(profiler.SLOW_QUERIES))
+    st.divider()
+
+    # =============================
+    # 1. PAGE RENDERS
+    # =============================
+    st.subheader("📄 Recent Page Renders")
+    st.caption("Many queries in one render from the same function usually means a query inside a loop (N+1).")
+    renders = list(profiler.RENDERS)[::-1]
+    if renders:
+        st.dataframe(pd.DataFrame(renders).rename(columns={
+            "at": "Time", "page": "Page", "queries": "Queries", "db_ms": "DB ms",
+            "wall_ms": "Total ms", "top": "Top Callers"}), use_container_width=True, hide_index=True)
+    else:
+        st.info("No page renders recorded yet.")
+    st.divider()
+
+    # =============================
+    # 2. SLOW QUERIES
+    # =============================
+    st.subheader(f"🐢 Slow Queries (≥ {profiler.SLOW_QUERY_MS:.0f} ms)")
+    slow = list(profiler.SLOW_QUERIES)[::-1]
+    if slow:
+        for q in slow[:50]:
+            with st.expander(f"{q['at']} · {q['function']} · {q['ms']} ms · {q['rows']} row(s)"):
+                st.code(q["sql"], language="sql")
+                plan = profiler.query_plan(q)
+                if plan:
+                    st.caption("EXPLAIN QUERY PLAN")
+                    st.code(plan, language="text")
+    else:
+        st.success("✅ No slow queries recorded.")
+    st.divider()
+
+    # =============================
+    # 3. TIME BY FUNCTION / STATEMENT
+    # =============================
+    st.subheader("📊 Time by Function")
+    if functions:
+        df_fn = pd.DataFrame(functions)[["function", "calls", "ms", "avg_ms", "max_ms", "rows"]]
+        st.dataframe(df_fn.round(2).rename(columns={
+            "function": "Function", "calls": "Calls", "ms": "Total ms", "avg_ms": "Avg ms",
+            "max_ms": "Max ms", "rows": "Rows"}), use_container_width=True, hide_index=True)
+
+    with st.expander("🔎 Time by SQL Statement"):
+        statements = profiler.statement_stats()
+        if statements:
+            df_sql = pd.DataFrame(statements)[["sql", "function", "calls", "ms", "avg_ms", "max_ms", "rows"]]
+            st.dataframe(df_sql.round(2), use_container_width=True, hide_index=True)
+            st.download_button("⬇️ Download (CSV)", df_sql.to_csv(index=False),
+                               file_name="query_stats.csv", mime="text/csv")
+
+    if st.button("🧹 Reset Statistics"):
+        profiler.reset()
+        st.rerun()
+    st.divider()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,14 @@ import pandas as pd
 import bcrypt,sqlite3
 import matplotlib.pyplot as plt
 from utils.rbac import allow_roles
+from utils import forecast, risk
+from utils.auth import login_queue_stats
+from utils.cache import cache_stats
+from utils.outbox import outbox_stats
 from utils.models import (
     all_users, create_user, get_user_by_email,
     count_users_by_role, count_courses,
-    get_avg_gpa, get_avg_attendance, get_system_alerts
+    get_avg_gpa, get_avg_attendance, get_system_alerts, compute_term_gpas
 )
 
 
@@ -41,18 +45,96 @@ def main():
     # =============================
     st.subheader("⚡ Quick Stats")
     col1, col2, col3 = st.columns(3)
+    avg_gpa, avg_attendance = get_avg_gpa(), get_avg_attendance()
     with col1:
-        st.metric("📈 Avg GPA", f"{get_avg_gpa():.2f}")
+        st.metric("📈 Avg GPA", f"{avg_gpa:.2f}")
     with col2:
-        st.metric("🕒 Avg Attendance", f"{get_avg_attendance():.1f}%")
+        st.metric("🕒 Avg Attendance", f"{avg_attendance:.1f}%")
     with col3:
-        alerts = get_system_alerts()
+        alerts = get_system_alerts(avg_attendance, avg_gpa)
         st.metric("🚨 System Alerts", len(alerts))
 
     if alerts:
         with st.expander("🔔 View Alerts"):
             for a in alerts:
                 st.warning(f"⚠️ {a}")
+
+    with st.expander("🎓 Compute Term GPAs"):
+        col1, col2, col3 = st.columns(3)
+        gpa_session = col1.selectbox("📅 Session", ["2024/2025"], key="gpa_session")
+        gpa_semester = col2.selectbox("🏫 Semester", ["First", "Second"], key="gpa_semester")
+        gpa_level = col3.selectbox("🎓 Level", ["All", "ND1", "ND2", "HND1", "HND2"], key="gpa_level")
+        if st.button("▶️ Run GPA Batch"):
+            with st.spinner("Computing GPAs..."):
+                n = compute_term_gpas(gpa_session, gpa_semester, None if gpa_level == "All" else gpa_level)
+            st.success(f"✅ GPA computed for {n} student(s).")
+            st.rerun()
+
+    with st.expander("🚩 At-Risk Scan"):
+        col1, col2 = st.columns(2)
+        risk_session = col1.selectbox("📅 Session", ["2024/2025"], key="risk_session")
+        risk_semester = col2.selectbox("🏫 Semester", ["First", "Second"], key="risk_semester")
+        st.caption(f"Flags attendance below {risk.ATTENDANCE_WARNING:.0f}%, CA averages below "
+                   f"{risk.CA_FAIL:.0f} and projected GPA drops of {risk.GPA_DROP_WARNING}+; "
+                   "each lecturer gets one summary notification.")
+        if st.button("▶️ Run At-Risk Scan"):
+            with st.spinner("Scanning enrolled students..."):
+                n = risk.run_risk_scan(risk_session, risk_semester)
+            st.success(f"✅ {n} flag(s) written.")
+            st.rerun()
+
+    with st.expander("🔐 Login Verification Queue"):
+        q = login_queue_stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("In Flight", f"{q['in_flight']} / {q['workers']} workers")
+        col2.metric("Avg Queue Wait", f"{q['avg_wait_ms']} ms")
+        col3.metric("Avg bcrypt Check", f"{q['avg_verify_ms']} ms")
+        col4.metric("Rejected (Busy)", q["rejected"])
+        st.caption(f"Work factor: {q['rounds']} rounds · {q['completed']} checks · "
+                   f"peak {q['max_in_flight']} in flight · {q['rehashed']} hash(es) upgraded on login.")
+
+    with st.expander("🗃️ Reference Data Cache"):
+        c = cache_stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Hit Rate", f"{c['hit_rate']}%")
+        col2.metric("Hits / Misses", f"{c['hits']} / {c['misses']}")
+        col3.metric("Entries", f"{c['entries']} / {c['max_entries']}")
+        col4.metric("Evictions", c["evictions"])
+        st.caption(f"Shared by all sessions in this process · TTL {c['ttl']:.0f}s · "
+                   f"{c['invalidations']} write invalidation(s).")
+
+    with st.expander("📨 Notification Outbox"):
+        o = outbox_stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Events", o["queued"])
+        col2.metric("Rows Written", o["inserted"])
+        col3.metric("Coalesced", o["coalesced"])
+        col4.metric("Pending", o["pending"])
+        st.caption("Repeated score / attendance notifications for a course are folded into one row "
+                   "until someone reads it.")
+        if o["errors"]:
+            st.warning(f"⚠️ {o['errors']} failed flush(es); last: {o['last_error']}")
+
+    with st.expander("🔮 GPA Forecast Model"):
+        model = forecast.load_model()
+        status = forecast.TRAINING_STATUS
+        if model is not None:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Model Version", str(model["version"][0]))
+            col2.metric("Training Samples", int(model["samples"][0]))
+            col3.metric("R²", f"{float(model['r2'][0]):.2f}")
+        else:
+            st.info("No forecast model trained yet — projected GPA mirrors the current GPA.")
+        if status["running"]:
+            st.info("⏳ Retraining in progress...")
+        elif status["last_error"]:
+            st.warning(f"⚠️ Last training run failed: {status['last_error']}")
+        if st.button("🔁 Retrain Model"):
+            # runs on a background thread so the app keeps serving pages
+            if forecast.train_in_background():
+                st.success("Retraining started.")
+            else:
+                st.info("A training run is already in progress.")
     st.divider()
 
     # =============================
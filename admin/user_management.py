@@ -1,10 +1,12 @@
 import streamlit as st
 import pandas as pd
-import bcrypt,sqlite3
+import sqlite3
 from utils.rbac import allow_roles
 from utils.db import get_conn
+from utils import importer
+from utils.auth import hash_password
 from utils.models import( create_user,all_users,get_user_by_email,count_users_by_role,
-                         delete_user_by_email,reset_password,get_user_by_matric
+                         delete_user_by_email,reset_password,get_user_by_matric,set_user_active
 )
 
 
@@ -87,10 +89,41 @@ def main():
                     st.error("🚨 Matric number already exists")
                     return
             # ✅ Now handle creation for both students & staff
-            hashed = bcrypt.hashpw(pwd.encode(), bcrypt.gensalt())
+            hashed = hash_password(pwd)
             user_id = create_user(full_name, email, role, hashed, matric_no, level)
             st.success(f"✅ {role_display} account created for {full_name}")
 
+    # === Bulk Onboarding ===
+    with st.expander("📥 Bulk Onboard Users (CSV / Excel)"):
+        st.caption("Columns: full_name, email, role, matric_no, level, password. "
+                   "Role defaults to the choice below; blank passwords get a random temporary one.")
+        st.download_button("⬇️ Template", importer.template_csv("roster"),
+                           file_name="roster_template.csv", mime="text/csv")
+        default_role = st.selectbox("🛠️ Default Role", ["Student", "Lecturer", "Admin"], key="bulk_role").lower()
+        roster = st.file_uploader("Roster", type=["csv", "xlsx"], key="roster_import")
+        if roster is not None and st.button("📥 Create Accounts"):
+            bar = st.progress(0.0, text="Validating roster...")
+
+            def show_progress(stage, done, total):
+                bar.progress(done / total if total else 1.0, text=f"{stage.title()} {done}/{total}")
+
+            try:
+                report, created = importer.import_roster(roster, default_role, progress=show_progress)
+            except ValueError as e:
+                st.error(f"❌ {e}")
+            else:
+                bar.progress(1.0, text="Done")
+                st.success(f"✅ {report.written} of {report.rows} account(s) created.")
+                if not created.empty:
+                    st.download_button("⬇️ New Accounts + Temporary Passwords (CSV)", created.to_csv(index=False),
+                                       file_name="new_accounts.csv", mime="text/csv")
+                if report.failed:
+                    st.warning(f"⚠️ {report.failed} row(s) skipped (duplicates or invalid).")
+                    errors = report.error_frame()
+                    st.dataframe(errors, use_container_width=True)
+                    st.download_button("⬇️ Duplicates / Error Report (CSV)", errors.to_csv(index=False),
+                                       file_name="roster_errors.csv", mime="text/csv")
+
     # === Reset Password ===
     with st.expander("🔄 Reset Password"):
         reset_email = st.text_input("📧 Email for reset")
@@ -103,7 +136,7 @@ def main():
             elif not new_pwd:
                 st.error("⚠️ Please enter a new password")
             else:
-                hashed = bcrypt.hashpw(new_pwd.encode(), bcrypt.gensalt())
+                hashed = hash_password(new_pwd)
                 reset_password(reset_email, hashed)
                 st.success(f"🔄 Password reset for {reset_email}")
 
@@ -115,9 +148,9 @@ def main():
 
         if st.button("Apply Action"):
             val = 1 if action=="Activate" else 0
-            with get_conn() as conn:
-                conn.execute("UPDATE users SET is_active=? WHERE email=?", (val, email))
-                conn.commit()
+            user = get_user_by_email(email)
+            if user:
+                set_user_active(user["id"], val)  # also refreshes cached user records
             st.success(f"User with the email - {email} has been {action.lower()}d ✅")
 
     # === Delete User ===
@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 from utils.rbac import allow_roles
-from utils.models import lecturer_pick_course, list_students_in_course, get_recent_notifications,get_course_id_by_code
+from utils.models import lecturer_pick_course, list_students_in_course, get_recent_notifications,get_course_id_by_code, risk_flags_for_lecturer, RISK_LABELS
 from utils.db import get_conn
 
 @allow_roles("lecturer")
@@ -100,6 +100,21 @@ def main():
     else:
         st.info("No overview available. Register for courses to see stats.")
 
+    # -------------------------------
+    # At-Risk Students (from the last admin scan)
+    # -------------------------------
+    st.divider()
+    st.subheader("🚩 At-Risk Students")
+
+    flags = risk_flags_for_lecturer(u["id"], session, semester)
+    if flags:
+        df_flags = pd.DataFrame(flags, columns=["Course", "Student", "Matric No", "Reason", "Severity", "Value", "Threshold", "Flagged At"])
+        df_flags["Reason"] = df_flags["Reason"].map(RISK_LABELS)
+        st.metric("Flagged Students", df_flags["Matric No"].nunique())
+        st.dataframe(df_flags, use_container_width=True)
+    else:
+        st.info("No students flagged for your courses this semester.")
+
     # -------------------------------
     # Notifications
     # -------------------------------
@@ -131,7 +146,7 @@ def main():
         st.subheader("📚 Enrolled Students")
         course_list = list_students_in_course(cid, session, semester)
         if course_list:
-            st.dataframe(pd.DataFrame(course_list,columns=["Student Name","Email"]), use_container_width=True)
+            st.dataframe(pd.DataFrame([(s["full_name"], s["email"]) for s in course_list],columns=["Student Name","Email"]), use_container_width=True)
         else:
             st.info(f"No Student have enrolled for {course_code} yet.")
 
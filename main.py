@@ -1,21 +1,18 @@
 import streamlit as st
 import time
-import bcrypt, re
-from utils.models import create_user,get_user_by_email,update_is_active,get_user_by_matric
+import re
+from utils.models import create_user,get_user_by_email,update_is_active,get_user_by_matric,unread_notification_count
 from utils.db import get_conn
+from utils.auth import hash_password, verify_login, LoginBusy
+from utils.identity import UserRecord
+from utils.profiler import page_render
+from utils.migrations import migrate
 
 
 
 def set_user_session(user_row):
-    """Set the session state for a logged-in user."""
-    st.session_state['user'] = {
-        'id': user_row[0],
-        'email': user_row[1],
-        'full_name': user_row[2],
-        'matric_no': user_row[3],
-        'role': user_row[4],
-        'level': user_row[6]
-    }
+    """Cache the logged-in user's record for the session (see utils/identity.py)."""
+    st.session_state['user'] = UserRecord.from_row(user_row)
 
 
 # ----------------- AUTHENTICATION -----------------
@@ -33,7 +30,13 @@ def sign_in():
             st.error("Email not registered. Please sign up first.")
             return
         hashed_password = user[5]
-        if bcrypt.checkpw(password.encode(), hashed_password):
+        try:
+            # runs on the bounded login pool; upgrades old-cost hashes in the background
+            ok = verify_login(user[0], password, hashed_password)
+        except LoginBusy as e:
+            st.warning(f"⏳ {e}")
+            return
+        if ok:
             set_user_session(user)
             update_is_active(user[0], 1)
             # st.success(f"Welcome back, {user[2]}!")
@@ -82,7 +85,7 @@ def sign_up():
                 st.error("🚨 Matric number already exists")
                 return
         # ✅ Now handle creation for both students & staff
-        hashed = bcrypt.hashpw(pwd.encode(), bcrypt.gensalt())
+        hashed = hash_password(pwd)
         user_id = create_user(full_name, email, role, hashed, matric_no, level)
         st.success(f"✅ {role_display} created for {full_name}")
 
@@ -110,7 +113,7 @@ def reset_password():
         if not user:
             st.error("⚠️ Email not registered.")
             return
-        hashed = bcrypt.hashpw(new_password.encode(), bcrypt.gensalt())
+        hashed = hash_password(new_password)
         with get_conn() as conn:
             c = conn.cursor()
             c.execute("UPDATE users SET password_hash = ? WHERE email = ?", (hashed, email))
@@ -211,8 +214,12 @@ def menu():
     about_page = st.Page("About_Us.py", title="About Us",icon="ℹ️")
     help_page = st.Page("Help.py", title="Help & Support", icon="🆘")
     logout_page = st.Page(logout, title="Log out", icon=":material/logout:")
-    notification_page = st.Page("Notifications.py", title="Notifications", icon="🔔")
+    # unread badge: one primary-key lookup on notification_state per render
+    unread = unread_notification_count(user["id"]) if role else 0
+    notification_page = st.Page("Notifications.py", title=f"Notifications ({unread})" if unread else "Notifications",
+                                icon="🔔", url_path="Notifications")
     security_settings = st.Page("settings.py", title="Security Settings", icon="🔐")
+    search_page = st.Page("Search.py", title="Search", icon="🔎")
 
     myCourses_page = st.Page("myCourses.py", title="My Courses & Resources", icon="📚")
 
@@ -253,7 +260,7 @@ def menu():
         courseReg_page = st.Page("6_Course_Registration.py", title="Course Registration", icon="🧾")
         groupMsg_page = st.Page("7_Group_Messaging.py", title="Group Messaging", icon="💬")
 
-        student_pages = [student_dash,attendance_page,assessment_page,courseReg_page,myCourses_page,notification_page,groupMsg_page]
+        student_pages = [student_dash,attendance_page,assessment_page,courseReg_page,myCourses_page,notification_page,groupMsg_page,search_page]
 
     # ------------------ Lecturer SPECIAL MENU ---------------------------
     if role == "Lecturer":
@@ -263,7 +270,7 @@ def menu():
         groupMsg_page = st.Page("7_Group_Messaging.py", title="Messaging/Announcements", icon="📢")
         student_performance_page = st.Page("lecturer/Student_Performance.py", title="Student Performance", icon="📊")
 
-        lecturer_pages = [lecturer_dash,courseReg_page,myCourses_page,attendance_page,assessment_page,student_performance_page,groupMsg_page,notification_page]
+        lecturer_pages = [lecturer_dash,courseReg_page,myCourses_page,attendance_page,assessment_page,student_performance_page,groupMsg_page,notification_page,search_page]
 
 
     # ------------------ Admin SPECIAL MENU ---------------------------
@@ -273,7 +280,7 @@ def menu():
         report_page = st.Page("admin/report.py", title="Reports & Analytics",icon="📊")
         systemLogs_page = st.Page("admin/System_Logs.py", title="System Logs",icon="🗂️")
 
-        admin_pages = [admin_dash,user_management_page,courseAllocation_page,report_page,systemLogs_page,notification_page]
+        admin_pages = [admin_dash,user_management_page,courseAllocation_page,report_page,systemLogs_page,notification_page,search_page]
 
     # ----------------- Navigation -----------------
     st.set_page_config(page_title="EduShield | 🔐 Authentication", page_icon="images/Edushield_Icon1.png", layout="wide")
@@ -297,10 +304,12 @@ def menu():
     else:
         pg = st.navigation([st.Page(auth)])
 
-    pg.run()
+    with page_render(pg.title):  # query counts per render, see admin/System_Logs.py
+        pg.run()
 
 # ----------------- MAIN -----------------
 def main():
+    migrate()  # no-op after the first run in this process
     menu()
     
 
@@ -1,18 +1,19 @@
 import streamlit as st
 import bcrypt
 import os
-from utils.models import update_user_info, change_password, update_profile_pic, get_user_settings
+from utils.models import update_user_info, change_password, update_profile_pic
+from utils.rbac import current_user
 
 UPLOAD_DIR = "profile_picture"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-def settings_page(user_id,role):
+def settings_page(user):
     st.set_page_config(page_title="EduShield | ⚙️ Account Settings", page_icon="images/Edushield_Icon1.png", layout="wide")
 
     st.title("⚙️ Account Settings")
     st.divider()
-    user = get_user_settings(user_id)
-    full_name, email, level, profile_pic = user
+    user_id, role = user.id, user.role
+    full_name, profile_pic = user.full_name, user.profile_pic
     
     # Profile Picture
     st.subheader("🖼️ Profile Picture")
@@ -55,10 +56,7 @@ def settings_page(user_id,role):
 
 
 def main():
-    u = st.session_state['user']
-    user_id = u['id']
-    role = u['role']
-    settings_page(user_id,role)
+    settings_page(current_user())
 
 
 main()
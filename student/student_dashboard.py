@@ -1,7 +1,8 @@
 import streamlit as st, pandas as pd
 from utils.rbac import allow_roles
-from utils.models import get_scores, student_enrollments ,attendance_summary,get_recent_notifications
-from utils.gpa import current_gpa, projected_gpa
+from utils.models import get_scores, student_enrollments ,attendance_summary,get_recent_notifications, risk_flags_for_student, RISK_LABELS
+from utils.gpa import current_gpa
+from utils import forecast
 import myCourses,Attendance
 from student import gpa
 
@@ -33,12 +34,10 @@ def main():
     # --------------------------
     st.subheader("⚡ Quick Stats")
     scores = get_scores(u["id"])
-    cgpa = current_gpa(scores)
-    pgpa = projected_gpa(scores)
+    cgpa = current_gpa(scores)  # uniform get_scores rows take the vectorized path
 
     col1, col2, col3 = st.columns(3)
     col1.metric("Current GPA", cgpa)
-    col2.metric("Projected GPA", pgpa)
     st.markdown("--------------------")
    
 
@@ -57,7 +56,20 @@ def main():
         st.info("No Attendance found for this session/semester.")
 
 
+    # forecast model (utils/forecast.py), fed the same term_features it was trained on;
+    # mirrors the current GPA until one is trained
+    pgpa = forecast.predict_term_gpas(session, semester, [u["id"]]).get(u["id"], cgpa)
+    col2.metric("Projected GPA", pgpa)
     col3.metric("Attendance %", f"{avg_att}%")
+
+    # precomputed by the at-risk scan (utils/risk.py)
+    for f in risk_flags_for_student(u["id"], session, semester):
+        where = f" in {f['code']}" if f["code"] else ""
+        msg = f"⚠️ Early warning: {RISK_LABELS[f['kind']]}{where} ({f['value']} vs {f['threshold']})."
+        if f["severity"] == "critical":
+            st.error(msg)
+        else:
+            st.warning(msg)
     
     st.markdown("--------------------")
 
@@ -1,13 +1,192 @@
+"""
+Password hashing and verification.
+
+bcrypt checks run on a small, bounded thread pool (bcrypt releases the GIL
+while hashing) instead of on each Streamlit script thread, so a login burst
+is limited to LOGIN_WORKERS concurrent hashes and queues behind them rather
+than oversubscribing the CPU. LOGIN_STATS exposes the queue metrics.
+Hashes made with a different cost than BCRYPT_ROUNDS are upgraded after
+the next successful login.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import bcrypt
 from .db import get_conn
 
+# work-factor policy: new hashes use this cost; older ones are rehashed on login
+BCRYPT_ROUNDS = int(os.environ.get("EDUSHIELD_BCRYPT_ROUNDS", 12))
+
+# login verification pool: concurrent hashes, and how many more may wait
+LOGIN_WORKERS = int(os.environ.get("EDUSHIELD_LOGIN_WORKERS", os.cpu_count() or 2))
+LOGIN_QUEUE_MAX = int(os.environ.get("EDUSHIELD_LOGIN_QUEUE_MAX", 256))
+LOGIN_TIMEOUT = float(os.environ.get("EDUSHIELD_LOGIN_TIMEOUT_SECS", 30))
+
+# bulk hashing (roster imports): bcrypt is CPU-bound, so spread it over processes
+HASH_WORKERS = int(os.environ.get("EDUSHIELD_HASH_WORKERS", os.cpu_count() or 2))
+HASH_CHUNK = 64
+
+LOGIN_STATS = {
+    "submitted": 0, "completed": 0, "rejected": 0, "rehashed": 0,
+    "in_flight": 0, "max_in_flight": 0,
+    "wait_ms_total": 0.0, "verify_ms_total": 0.0, "max_wait_ms": 0.0,
+}
+_stats_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(LOGIN_WORKERS + LOGIN_QUEUE_MAX)
+
+
+class LoginBusy(RuntimeError):
+    """Raised when the verification queue is full for longer than LOGIN_TIMEOUT."""
+
+
 def get_user_by_email(email:str):
     with get_conn() as conn:
         cur = conn.execute("SELECT * FROM users WHERE email=? AND is_active=1", (email,))
         return cur.fetchone()
 
-def verify_password(pwd:str, password_hash:bytes)->bool:
+
+# ----------------- Hashing -----------------
+def hash_password(pwd: str, rounds: int = None) -> bytes:
+    return bcrypt.hashpw(pwd.encode(), bcrypt.gensalt(rounds or BCRYPT_ROUNDS))
+
+
+def hash_cost(password_hash) -> int:
+    """The cost factor stored in a bcrypt hash ($2b$12$... -> 12), or 0 if unreadable."""
+    try:
+        if isinstance(password_hash, str):
+            password_hash = password_hash.encode()
+        return int(password_hash.split(b"$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return 0
+
+
+def needs_rehash(password_hash) -> bool:
+    return hash_cost(password_hash) != BCRYPT_ROUNDS
+
+
+def hash_passwords(passwords, workers: int = None, progress=None):
+    """
+    Hash many passwords in a process pool, preserving order. progress(done, total)
+    is called after every chunk. Falls back to in-process hashing for tiny inputs.
+    """
+    passwords = list(passwords)
+    total = len(passwords)
+    workers = max(1, workers or HASH_WORKERS)
+    if total <= HASH_CHUNK or workers == 1:
+        hashes = []
+        for i, pwd in enumerate(passwords, 1):
+            hashes.append(hash_password(pwd))
+            if progress and (i % HASH_CHUNK == 0 or i == total):
+                progress(i, total)
+        return hashes
+
+    chunks = [passwords[i:i + HASH_CHUNK] for i in range(0, total, HASH_CHUNK)]
+    hashes, done = [], 0
+    # spawn, not fork: a forked child would inherit the server's held locks and
+    # pooled SQLite connections
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        for batch in pool.map(_hash_chunk, chunks, [BCRYPT_ROUNDS] * len(chunks)):
+            hashes.extend(batch)
+            done += len(batch)
+            if progress:
+                progress(done, total)
+    return hashes
+
+
+def _hash_chunk(passwords, rounds):
+    return [hash_password(p, rounds) for p in passwords]
+
+
+# ----------------- Verification -----------------
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=LOGIN_WORKERS, thread_name_prefix="bcrypt-login")
+    return _executor
+
+
+def _checkpw(pwd, password_hash, queued_at):
+    started = time.perf_counter()
     try:
         return bcrypt.checkpw(pwd.encode(), password_hash)
     except Exception:
         return False
+    finally:
+        wait_ms = (started - queued_at) * 1000
+        verify_ms = (time.perf_counter() - started) * 1000
+        with _stats_lock:
+            LOGIN_STATS["completed"] += 1
+            LOGIN_STATS["wait_ms_total"] += wait_ms
+            LOGIN_STATS["verify_ms_total"] += verify_ms
+            LOGIN_STATS["max_wait_ms"] = max(LOGIN_STATS["max_wait_ms"], wait_ms)
+
+
+def _submit(fn, *args):
+    """Run fn on the login pool, waiting at most LOGIN_TIMEOUT for a queue slot."""
+    if not _slots.acquire(timeout=LOGIN_TIMEOUT):
+        with _stats_lock:
+            LOGIN_STATS["rejected"] += 1
+        raise LoginBusy("Too many sign-ins in progress, please try again in a moment.")
+    with _stats_lock:
+        LOGIN_STATS["submitted"] += 1
+        LOGIN_STATS["in_flight"] += 1
+        LOGIN_STATS["max_in_flight"] = max(LOGIN_STATS["max_in_flight"], LOGIN_STATS["in_flight"])
+
+    def done(_):
+        with _stats_lock:
+            LOGIN_STATS["in_flight"] -= 1
+        _slots.release()
+
+    future = _get_executor().submit(fn, *args)
+    future.add_done_callback(done)
+    return future
+
+
+def verify_password(pwd:str, password_hash:bytes)->bool:
+    """bcrypt check on the login pool; raises LoginBusy if the queue stays full."""
+    if not pwd or not password_hash:
+        return False
+    return _submit(_checkpw, pwd, password_hash, time.perf_counter()).result()
+
+
+def _rehash(user_id, pwd, old_hash):
+    new_hash = hash_password(pwd)
+    with get_conn() as conn:
+        # only replace the hash we verified, in case the password changed meanwhile
+        conn.execute("UPDATE users SET password_hash=? WHERE id=? AND password_hash=?",
+                     (new_hash, user_id, old_hash))
+    with _stats_lock:
+        LOGIN_STATS["rehashed"] += 1
+
+
+def verify_login(user_id: int, pwd: str, password_hash) -> bool:
+    """
+    verify_password, then (in the background) upgrade the stored hash if it was
+    made with a cost other than BCRYPT_ROUNDS.
+    """
+    ok = verify_password(pwd, password_hash)
+    if ok and needs_rehash(password_hash):
+        try:
+            _submit(_rehash, user_id, pwd, password_hash)
+        except LoginBusy:
+            pass  # upgrade on a later login
+    return ok
+
+
+def login_queue_stats() -> dict:
+    """LOGIN_STATS plus derived averages, for the admin pages."""
+    with _stats_lock:
+        s = dict(LOGIN_STATS)
+    done = s["completed"] or 1
+    s["avg_wait_ms"] = round(s["wait_ms_total"] / done, 1)
+    s["avg_verify_ms"] = round(s["verify_ms_total"] / done, 1)
+    s["workers"], s["queue_max"], s["rounds"] = LOGIN_WORKERS, LOGIN_QUEUE_MAX, BCRYPT_ROUNDS
+    return s
@@ -0,0 +1,85 @@
+"""
+Process-wide read cache for reference data in utils/models.py.
+
+    @cached("courses")
+    def list_all_courses(...): ...
+
+Results are shared by every Streamlit session in the process and keyed by
+function + arguments. An entry is served while it is younger than its TTL
+and none of the tables it depends on has been invalidated since it was
+stored; writers call invalidate("courses", ...) after committing. Memory is
+bounded by CACHE_MAX_ENTRIES with least-recently-used eviction.
+"""
+import copy
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_TTL = float(os.environ.get("EDUSHIELD_CACHE_TTL_SECS", 300))
+CACHE_MAX_ENTRIES = int(os.environ.get("EDUSHIELD_CACHE_MAX_ENTRIES", 512))
+
+STATS = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+_entries = OrderedDict()   # key -> (expires_at, table generations, value)
+_generations = {}          # table -> int
+_lock = threading.Lock()
+
+
+def _table_gens(tables):
+    return tuple(_generations.get(t, 0) for t in tables)
+
+
+def invalidate(*tables):
+    """Drop every cached result that depends on any of these tables."""
+    with _lock:
+        for t in tables:
+            _generations[t] = _generations.get(t, 0) + 1
+        STATS["invalidations"] += 1
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def cached(*tables, ttl: float = None):
+    """Cache a read function's results until TTL expiry or invalidate(<table>)."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            with _lock:
+                hit = _entries.get(key)
+                fresh = hit is not None and hit[0] > now and hit[1] == _table_gens(tables)
+                if fresh:
+                    _entries.move_to_end(key)
+                    STATS["hits"] += 1
+                    value = hit[2]
+                else:
+                    STATS["misses"] += 1
+                    # generations as of *before* the query: a write racing with it invalidates the entry
+                    gens = _table_gens(tables)
+            if not fresh:
+                value = fn(*args, **kwargs)
+                with _lock:
+                    _entries[key] = (now + (CACHE_TTL if ttl is None else ttl), gens, value)
+                    _entries.move_to_end(key)
+                    while len(_entries) > CACHE_MAX_ENTRIES:
+                        _entries.popitem(last=False)
+                        STATS["evictions"] += 1
+            # callers sometimes mutate the dicts they get back; never hand out the shared copy
+            return copy.deepcopy(value)
+
+        wrapper.uncached = fn
+        return wrapper
+    return deco
+
+
+def cache_stats() -> dict:
+    with _lock:
+        s = dict(STATS, entries=len(_entries), max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+    lookups = s["hits"] + s["misses"]
+    s["hit_rate"] = round(s["hits"] * 100.0 / lookups, 1) if lookups else 0.0
+    return s
@@ -1,13 +1,213 @@
+import os
+import queue
 import sqlite3
+import threading
+import time
 from contextlib import contextmanager
 
+from .profiler import PROFILING, ProfiledConnection
+
 DB_PATH = "secure.db"
 
-@contextmanager
-def get_conn():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
+# How many idle connections are kept open for reuse (per process).
+POOL_SIZE = int(os.environ.get("EDUSHIELD_DB_POOL_SIZE", "16"))
+# Idle connections older than this are pinged before being handed out again.
+HEALTH_CHECK_AFTER = float(os.environ.get("EDUSHIELD_DB_HEALTH_CHECK_SECS", "30"))
+
+# Named PRAGMA profiles applied to every new connection.
+#   interactive  - the Streamlit app: WAL so readers never wait on writers,
+#                  NORMAL sync (safe in WAL), a big page cache and mmap reads.
+#   bulk-import  - one-off loaders/migrations: bigger cache, in-memory temp
+#                  b-trees and no fsync per commit; run it on a backed-up file.
+PRAGMA_PROFILES = {
+    "interactive": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,        # ~64 MB (negative = KiB)
+        "mmap_size": 268435456,      # 256 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,        # ms
+        "wal_autocheckpoint": 1000,  # pages
+    },
+    "bulk-import": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -256000,       # ~256 MB
+        "mmap_size": 1073741824,     # 1 GB
+        "temp_store": "MEMORY",
+        "busy_timeout": 30000,
+        "wal_autocheckpoint": 10000,
+    },
+}
+DB_PROFILE = os.environ.get("EDUSHIELD_DB_PROFILE", "interactive")
+
+
+def apply_pragmas(conn, profile: str = None):
+    """Apply a named PRAGMA profile (plus foreign keys) to an open connection."""
+    name = profile or DB_PROFILE
+    if name not in PRAGMA_PROFILES:
+        raise ValueError(f"Unknown DB profile {name!r}; choose from {sorted(PRAGMA_PROFILES)}")
     conn.execute("PRAGMA foreign_keys = ON;")
+    for pragma, value in PRAGMA_PROFILES[name].items():
+        conn.execute(f"PRAGMA {pragma} = {value};")
+
+
+def _connect(path, profile=None):
+    """Open and configure a brand new connection."""
+    name = profile or DB_PROFILE
+    timeout = PRAGMA_PROFILES.get(name, {}).get("busy_timeout", 5000) / 1000
+    factory = ProfiledConnection if PROFILING else sqlite3.Connection  # query timing, see utils/profiler.py
+    conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False, factory=factory)
+    conn.row_factory = sqlite3.Row
+    apply_pragmas(conn, name)
+    return conn
+
+
+class ConnectionPool:
+    """
+    Small SQLite connection pool.
+
+    - a thread re-uses the connection it already holds, so nested get_conn()
+      calls share one connection and one transaction;
+    - released connections go back to a bounded LIFO idle queue;
+    - idle connections are health-checked before being reused.
+    """
+
+    def __init__(self, path: str = DB_PATH, size: int = POOL_SIZE, profile: str = None):
+        self.path = path
+        self.profile = profile or DB_PROFILE
+        self.size = max(0, int(size))
+        self._idle = queue.LifoQueue(maxsize=self.size) if self.size else None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "reused": 0, "discarded": 0}
+
+    def _healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _checkout(self):
+        while self._idle is not None:
+            try:
+                conn, released_at = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if time.monotonic() - released_at < HEALTH_CHECK_AFTER or self._healthy(conn):
+                with self._lock:
+                    self.stats["reused"] += 1
+                return conn
+            self._discard(conn)
+        with self._lock:
+            self.stats["opened"] += 1
+        return _connect(self.path, self.profile)
+
+    def _checkin(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        if self._idle is None:
+            conn.close()
+            return
+        try:
+            self._idle.put_nowait((conn, time.monotonic()))
+        except queue.Full:
+            conn.close()
+
+    def _discard(self, conn):
+        with self._lock:
+            self.stats["discarded"] += 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def connection(self):
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            # nested call on the same thread: share the outer connection
+            self._local.depth += 1
+            try:
+                yield held
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self._checkout()
+        self._local.conn, self._local.depth = conn, 1
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+            raise
+        finally:
+            self._local.conn, self._local.depth = None, 0
+            self._checkin(conn)
+
+    def close_all(self):
+        """Close every idle connection (e.g. before deleting/replacing the DB file)."""
+        while self._idle is not None:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_PATH, POOL_SIZE, DB_PROFILE)
+    return _pool
+
+
+def configure(path: str = None, pool_size: int = None, profile: str = None):
+    """Re-point the pool at another database file, resize it or switch PRAGMA profile."""
+    global _pool, DB_PATH, POOL_SIZE, DB_PROFILE
+    if profile is not None and profile not in PRAGMA_PROFILES:
+        raise ValueError(f"Unknown DB profile {profile!r}; choose from {sorted(PRAGMA_PROFILES)}")
+    with _pool_lock:
+        if path is not None:
+            DB_PATH = path
+        if pool_size is not None:
+            POOL_SIZE = pool_size
+        if profile is not None:
+            DB_PROFILE = profile
+        if _pool is not None:
+            _pool.close_all()
+        _pool = None
+
+
+@contextmanager
+def get_conn(profile: str = None):
+    """
+    Yield a pooled connection. Passing a profile other than the pool's
+    (e.g. "bulk-import") gives a dedicated, unpooled connection instead.
+    """
+    pool = get_pool()
+    if profile is None or profile == pool.profile:
+        with pool.connection() as conn:
+            yield conn
+        return
+
+    conn = _connect(pool.path, profile)
     try:
         yield conn
         conn.commit()
@@ -0,0 +1,222 @@
+"""
+Projected-GPA forecasting.
+
+Features per student and term (session + semester) come from `scores`
+(test / assignment averages), `attendance_rollup` and the previous term's
+`student_gpa`. A ridge regression is fitted offline against the GPAs stored
+in student_gpa, saved to FORECAST_MODEL_PATH together with a version hash,
+and loaded once per process. Predictions are a single dot product.
+
+    python -m utils.forecast      # retrain and save the model
+"""
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .db import get_conn
+
+FORECAST_MODEL_PATH = os.environ.get("EDUSHIELD_FORECAST_MODEL", "gpa_forecast.npz")
+FEATURES = ["test_avg", "assignment_avg", "attendance_pct", "prev_gpa", "has_prev_gpa"]
+RIDGE_ALPHA = 1.0
+MIN_SAMPLES = 20
+
+SEMESTER_ORDER = {"First": 0, "Second": 1}
+
+TRAINING_STATUS = {"running": False, "last_error": None, "version": None, "samples": 0, "finished_at": None}
+_train_lock = threading.Lock()
+_cache = {"mtime": None, "model": None}
+_cache_lock = threading.Lock()
+
+
+def _term_key(session, semester):
+    return (str(session), SEMESTER_ORDER.get(semester, 9))
+
+
+# ----------------- Features -----------------
+def term_features(session: str = None, semester: str = None, student_ids=None) -> pd.DataFrame:
+    """
+    One row per (student_id, session, semester) with FEATURES (+ the stored
+    term GPA as "gpa" when student_gpa has it). Pass session/semester to
+    restrict to one term, student_ids to restrict to some students.
+    """
+    where, params = ["1=1"], []
+    if session and semester:
+        where.append("e.session=? AND e.semester=?")
+        params += [session, semester]
+    if student_ids is not None:
+        ids = [int(i) for i in student_ids]
+        if not ids:
+            return pd.DataFrame(columns=["student_id", "session", "semester", *FEATURES, "gpa"])
+        where.append(f"e.student_id IN ({','.join('?' * len(ids))})")
+        params += ids
+    where_sql = " AND ".join(where)
+    # prev_gpa needs every earlier term, so history is only narrowed by student
+    history_sql, history_params = "SELECT student_id, session, semester, gpa FROM student_gpa", []
+    if student_ids is not None:
+        history_sql += f" WHERE student_id IN ({','.join('?' * len(ids))})"
+        history_params = ids
+
+    with get_conn() as conn:
+        scores = pd.read_sql_query(f"""
+            SELECT e.student_id, e.session, e.semester,
+                   AVG(CASE WHEN s.component = 'test' THEN s.score END) AS test_avg,
+                   AVG(CASE WHEN s.component = 'assignment' THEN s.score END) AS assignment_avg
+            FROM enrollments e
+            LEFT JOIN scores s ON s.student_id = e.student_id AND s.course_id = e.course_id
+            WHERE {where_sql}
+            GROUP BY e.student_id, e.session, e.semester
+        """, conn, params=params)
+        attendance = pd.read_sql_query(f"""
+            SELECT e.student_id, e.session, e.semester,
+                   SUM(r.present) * 100.0 / SUM(r.total) AS attendance_pct
+            FROM enrollments e
+            JOIN attendance_rollup r ON r.student_id = e.student_id AND r.course_id = e.course_id
+            WHERE {where_sql} AND r.total > 0
+            GROUP BY e.student_id, e.session, e.semester
+        """, conn, params=params)
+        history = pd.read_sql_query(history_sql, conn, params=history_params)
+
+    df = scores.merge(attendance, on=["student_id", "session", "semester"], how="left")
+    df = df.merge(history, on=["student_id", "session", "semester"], how="left")
+
+    # previous term's GPA: latest student_gpa row strictly before this term
+    history["key"] = [_term_key(a, b) for a, b in zip(history["session"], history["semester"])]
+    history = history.sort_values(["student_id", "key"])
+    by_student = {sid: list(zip(g["key"], g["gpa"])) for sid, g in history.groupby("student_id")}
+    prev = []
+    for sid, sess, sem in zip(df["student_id"], df["session"], df["semester"]):
+        key, last = _term_key(sess, sem), np.nan
+        for k, g in by_student.get(sid, ()):
+            if k >= key:
+                break
+            last = g
+        prev.append(last)
+    df["prev_gpa"] = prev
+    df["has_prev_gpa"] = (~df["prev_gpa"].isna()).astype(float)
+    return df
+
+
+# ----------------- Training -----------------
+def _version(arrays):
+    h = hashlib.sha256()
+    for a in arrays:
+        h.update(np.ascontiguousarray(a).tobytes())
+    h.update(",".join(FEATURES).encode())
+    return h.hexdigest()[:12]
+
+
+def fit(df: pd.DataFrame, alpha: float = RIDGE_ALPHA) -> dict:
+    """Fit a standardized ridge regression of gpa on FEATURES."""
+    data = df.dropna(subset=["gpa"])
+    if len(data) < MIN_SAMPLES:
+        raise ValueError(f"Need at least {MIN_SAMPLES} past term GPAs to train, found {len(data)}.")
+    X = data[FEATURES].to_numpy(dtype=float)
+    y = data["gpa"].to_numpy(dtype=float)
+
+    fill = np.nanmean(X, axis=0)
+    fill = np.where(np.isnan(fill), 0.0, fill)
+    X = np.where(np.isnan(X), fill, X)
+    mean, std = X.mean(axis=0), X.std(axis=0)
+    std = np.where(std > 0, std, 1.0)
+    Z = (X - mean) / std
+
+    A = Z.T @ Z + alpha * np.eye(Z.shape[1])
+    coef = np.linalg.solve(A, Z.T @ (y - y.mean()))
+    intercept = y.mean()
+
+    pred = Z @ coef + intercept
+    ss_res, ss_tot = float(((y - pred) ** 2).sum()), float(((y - y.mean()) ** 2).sum())
+    model = {
+        "coef": coef, "intercept": np.array([intercept]),
+        "mean": mean, "std": std, "fill": fill,
+        "samples": np.array([len(y)]),
+        "r2": np.array([1 - ss_res / ss_tot if ss_tot else 0.0]),
+    }
+    model["version"] = np.array([_version([coef, model["intercept"], mean, std, fill])])
+    return model
+
+
+def save_model(model: dict, path: str = None):
+    """Write atomically so a reader never loads a half-written file."""
+    path = path or FORECAST_MODEL_PATH
+    tmp = f"{path}.tmp.npz"
+    np.savez(tmp, features=np.array(FEATURES), **model)
+    os.replace(tmp, path)
+
+
+def train(path: str = None) -> dict:
+    """Build features for every past term, fit and save. Returns the model."""
+    model = fit(term_features())
+    save_model(model, path)
+    return model
+
+
+def _train_job(path):
+    try:
+        model = train(path)
+        TRAINING_STATUS.update(last_error=None, version=str(model["version"][0]),
+                               samples=int(model["samples"][0]))
+    except Exception as e:
+        TRAINING_STATUS["last_error"] = str(e)
+    finally:
+        TRAINING_STATUS.update(running=False, finished_at=time.strftime("%Y-%m-%d %H:%M:%S"))
+        _train_lock.release()
+
+
+def train_in_background(path: str = None) -> bool:
+    """Retrain on a daemon thread; returns False if a run is already going."""
+    if not _train_lock.acquire(blocking=False):
+        return False
+    TRAINING_STATUS["running"] = True
+    threading.Thread(target=_train_job, args=(path,), daemon=True, name="gpa-forecast-train").start()
+    return True
+
+
+# ----------------- Prediction -----------------
+def load_model(path: str = None):
+    """The saved model (cached per process, reloaded when the file changes), or None."""
+    path = path or FORECAST_MODEL_PATH
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if _cache["mtime"] != mtime:
+        with _cache_lock:
+            if _cache["mtime"] != mtime:
+                with np.load(path, allow_pickle=False) as f:
+                    model = {k: f[k] for k in f.files}
+                if list(model["features"]) != FEATURES:
+                    return None  # trained for another feature set: retrain
+                _cache.update(mtime=mtime, model=model)
+    return _cache["model"]
+
+
+def predict(X, model=None) -> np.ndarray:
+    """Projected GPAs for a (n, len(FEATURES)) array; NaNs take the training means."""
+    model = model or load_model()
+    X = np.atleast_2d(np.asarray(X, dtype=float))
+    X = np.where(np.isnan(X), model["fill"], X)
+    out = ((X - model["mean"]) / model["std"]) @ model["coef"] + model["intercept"][0]
+    return np.clip(out, 0.0, 4.0)
+
+
+def predict_term_gpas(session: str, semester: str, student_ids=None) -> dict:
+    """{student_id: projected GPA} for a term, in one batch (empty if no model)."""
+    model = load_model()
+    if model is None:
+        return {}
+    df = term_features(session, semester, student_ids)
+    if df.empty:
+        return {}
+    preds = predict(df[FEATURES].to_numpy(dtype=float), model)
+    return {int(s): round(float(p), 2) for s, p in zip(df["student_id"], preds)}
+
+
+if __name__ == "__main__":
+    m = train()
+    print(f"Saved {FORECAST_MODEL_PATH}: version {m['version'][0]}, "
+          f"{int(m['samples'][0])} samples, R^2 {float(m['r2'][0]):.3f}")
@@ -1,7 +1,17 @@
 import sqlite3
 import statistics
 from collections import defaultdict
-from typing import Iterable, Any
+from typing import Iterable, Any, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Course score = EXAM_WEIGHT * exam average + CA_WEIGHT * CA (test/assignment) average
+EXAM_WEIGHT, CA_WEIGHT = 0.6, 0.4
+
+# letter_point() as lookup tables: scores >= GRADE_BOUNDS[i] earn GRADE_POINTS[i + 1]
+GRADE_BOUNDS = np.array([40.0, 45.0, 50.0, 60.0, 70.0])
+GRADE_POINTS = np.array([0.0, 2.0, 2.5, 3.0, 3.5, 4.0])
 
 def letter_point(score: float) -> float:
     """Map numeric score to grade points (adjust to your school scale if needed)."""
@@ -18,6 +28,39 @@ def letter_point(score: float) -> float:
     if s >= 40: return 2.0
     return 0.0
 
+# ------- Vectorized engine (whole cohorts / columnar input) -------
+def letter_points(scores) -> np.ndarray:
+    """Vectorized letter_point(): array of scores -> array of grade points (NaN -> 0.0)."""
+    s = np.asarray(scores, dtype=float)
+    points = GRADE_POINTS[np.searchsorted(GRADE_BOUNDS, s, side="right")]
+    return np.where(np.isnan(s), 0.0, points)
+
+def final_course_scores(exam_avg, ca_avg) -> np.ndarray:
+    """
+    Weighted course score per row: 0.6 exam + 0.4 CA, or whichever one
+    exists. Rows with neither come back as NaN.
+    """
+    exam = np.asarray(exam_avg, dtype=float)
+    ca = np.asarray(ca_avg, dtype=float)
+    weighted = EXAM_WEIGHT * exam + CA_WEIGHT * ca
+    return np.where(np.isnan(exam), ca, np.where(np.isnan(ca), exam, weighted))
+
+def gpas_by_group(group_ids, units, exam_avg, ca_avg):
+    """
+    Unit-weighted GPA per group (e.g. per student) from per-course averages.
+    Returns (unique_group_ids, gpas) with GPAs rounded to 2 d.p.
+    Courses with no scores at all are ignored, as in current_gpa().
+    """
+    final = final_course_scores(exam_avg, ca_avg)
+    keep = ~np.isnan(final)
+    groups, idx = np.unique(np.asarray(group_ids)[keep], return_inverse=True)
+    u = np.asarray(units, dtype=float)[keep]
+    u = np.where(np.isnan(u), 0.0, u)
+    points = np.bincount(idx, weights=letter_points(final[keep]) * u, minlength=len(groups))
+    total_units = np.bincount(idx, weights=u, minlength=len(groups))
+    gpas = np.divide(points, total_units, out=np.zeros(len(groups)), where=total_units > 0)
+    return groups, np.round(gpas, 2)
+
 def _pick_value(mapping: dict, candidates: Iterable[str]):
     """Return first present value from mapping for a list of candidate keys (case-insensitive)."""
     # direct check first
@@ -105,11 +148,87 @@ def _normalize_scores_rows(rows: Iterable[Any]):
 
     return normalized
 
+# column name -> accepted aliases, for DataFrames / column mappings / get_scores rows
+_COLUMNS = {
+    "code": ("code", "Course Code"),
+    "units": ("units", "Course Units"),
+    "component": ("component", "Component"),
+    "score": ("score", "Score"),
+}
+
+def _resolve_columns(keys) -> dict:
+    """Map code/units/component/score to the matching keys, or {} if any is missing."""
+    found = {}
+    for name, aliases in _COLUMNS.items():
+        match = next((a for a in aliases if a in keys), None)
+        if match is None:
+            return {}
+        found[name] = match
+    return found
+
+def _as_columns(scores_rows):
+    """
+    Return (code, units, component, score) sequences when the input is
+    already columnar or uniformly shaped, else None (use the tolerant path).
+    """
+    if isinstance(scores_rows, pd.DataFrame):
+        cols = _resolve_columns(scores_rows.columns)
+        return tuple(scores_rows[cols[k]].to_numpy() for k in _COLUMNS) if cols else None
+    if isinstance(scores_rows, Mapping):
+        cols = _resolve_columns(scores_rows.keys())
+        return tuple(scores_rows[cols[k]] for k in _COLUMNS) if cols else None
+    if isinstance(scores_rows, list) and scores_rows and type(scores_rows[0]) is dict:
+        # e.g. get_scores(): every row is a dict with the same friendly keys
+        cols = _resolve_columns(scores_rows[0].keys())
+        if cols and all(type(r) is dict for r in scores_rows):
+            try:
+                return tuple([r[cols[k]] for r in scores_rows] for k in _COLUMNS)
+            except KeyError:
+                return None
+    return None
+
+def current_gpa_columns(code: Sequence, units: Sequence, component: Sequence, score: Sequence) -> float:
+    """
+    Fast path for current_gpa() on columnar input (equal-length arrays).
+    Same rules: per course 0.6 exam avg + 0.4 CA avg (or whichever exists),
+    letter_point grading, weighted by course units.
+    """
+    n = len(code)
+    if n == 0:
+        return 0.0
+    codes = pd.Series(code, dtype=object).fillna("__unknown__").to_numpy()
+    course_codes, idx = np.unique(codes.astype(str), return_inverse=True)
+    comp = pd.Series(component, dtype=object).astype(str).str.lower().to_numpy()
+    sc = pd.to_numeric(pd.Series(score), errors="coerce").to_numpy(dtype=float)
+    un = pd.to_numeric(pd.Series(units), errors="coerce").fillna(0).to_numpy(dtype=float)
+
+    valid = ~np.isnan(sc)
+    is_exam = (comp == "exam") & valid
+    is_ca = (comp != "exam") & valid
+    k = len(course_codes)
+    exam_n = np.bincount(idx, weights=is_exam, minlength=k)
+    ca_n = np.bincount(idx, weights=is_ca, minlength=k)
+    exam_sum = np.bincount(idx, weights=np.where(is_exam, sc, 0.0), minlength=k)
+    ca_sum = np.bincount(idx, weights=np.where(is_ca, sc, 0.0), minlength=k)
+    exam_avg = np.divide(exam_sum, exam_n, out=np.full(k, np.nan), where=exam_n > 0)
+    ca_avg = np.divide(ca_sum, ca_n, out=np.full(k, np.nan), where=ca_n > 0)
+
+    course_units = np.zeros(k)
+    np.maximum.at(course_units, idx, np.trunc(un))
+
+    _, gpas = gpas_by_group(np.zeros(k, dtype=int), course_units, exam_avg, ca_avg)
+    return float(gpas[0]) if len(gpas) else 0.0
+
 def current_gpa(scores_rows: Iterable[Any]) -> float:
     """
     Compute current GPA from rows that include course code, units, component, and score.
-    Accepts rows returned by your get_scores (or other shapes) — it's robust.
+    DataFrames, column mappings and uniform dict rows (get_scores) take the
+    vectorized fast path; any other shape goes through the tolerant path below.
     """
+    columns = _as_columns(scores_rows)
+    if columns is not None:
+        return current_gpa_columns(*columns)
+
     rows = _normalize_scores_rows(scores_rows)
 
     # group by course code, and collect component lists
@@ -157,13 +276,6 @@ def current_gpa(scores_rows: Iterable[Any]) -> float:
 
     return round(total_points / total_units, 2) if total_units else 0.0
 
-def projected_gpa(scores_rows: Iterable[Any]) -> float:
-    """
-    Placeholder projected GPA. For now it mirrors current_gpa.
-    You can later implement projection logic (e.g., assume pending exams = current CA avg).
-    """
-    return current_gpa(scores_rows)
-
 
 # ------- Example quick test (run in python REPL) -------
 # sample = [
@@ -172,4 +284,4 @@ def projected_gpa(scores_rows: Iterable[Any]) -> float:
 #     {"code": "CSC102", "units": 2, "component": "assignment", "score": 12},
 #     ("CSC103","Data Structures",3,"exam", 70)
 # ]
-# print(projected_gpa(sample))
+# print(current_gpa(sample))
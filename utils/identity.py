@@ -0,0 +1,69 @@
+"""
+The signed-in user's record, cached in st.session_state["user"].
+
+UserRecord is built once at sign-in from the users row and reused on every
+page, so navigation doesn't re-query the users table. Writes to a user
+(models.update_user_info, update_profile_pic, set_user_active, ...) call
+invalidate_user(), which bumps that user's generation; the next
+rbac.current_user() call in any of their sessions sees the stale
+generation and reloads the record with one query.
+"""
+import threading
+from dataclasses import dataclass, fields
+
+from .db import get_conn
+
+_generations = {}
+_gen_lock = threading.Lock()
+
+
+@dataclass(slots=True)
+class UserRecord:
+    id: int
+    email: str
+    full_name: str
+    role: str
+    matric_no: str | None = None
+    level: str | None = None
+    profile_pic: str | None = None
+    created_at: str | None = None
+    generation: int = 0
+
+    @classmethod
+    def from_row(cls, row):
+        """Build from a users row (sqlite3.Row or dict); extra columns such as password_hash are ignored."""
+        row = dict(row)
+        names = [f.name for f in fields(cls) if f.name != "generation"]
+        return cls(**{n: row.get(n) for n in names}, generation=generation(row["id"]))
+
+    # dict-style access, so existing u["full_name"] / u.get("level") code keeps working
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __contains__(self, key):
+        return hasattr(self, key)
+
+
+def generation(user_id: int) -> int:
+    return _generations.get(user_id, 0)
+
+
+def invalidate_user(user_id: int):
+    """Mark every cached copy of this user's record as stale."""
+    with _gen_lock:
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+
+
+def load_user(user_id: int):
+    with get_conn() as conn:
+        row = conn.execute("""
+            SELECT id, email, full_name, role, matric_no, level, profile_pic, created_at
+            FROM users WHERE id=?
+        """, (user_id,)).fetchone()
+    return UserRecord.from_row(row) if row else None
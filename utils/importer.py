@@ -0,0 +1,294 @@
+"""
+Bulk CSV / Excel import of scores and attendance.
+
+The upload is read in CHUNK_ROWS-row chunks, so a 50k-row result sheet never
+sits in memory as Python objects. Matric numbers and course codes are
+resolved through one lookup map each, every row is validated against the
+scores / attendance constraints, and the valid rows of a chunk are written
+with a single executemany and committed together. Invalid rows go to the
+error report instead of aborting the import.
+
+Scores sheet:      matric_no, course_code, component, score[, attempt]
+Attendance sheet:  matric_no, course_code, class_date, present
+Roster sheet:      full_name, email[, role, matric_no, level, password]
+"""
+import re
+import secrets
+
+import numpy as np
+import pandas as pd
+
+from .auth import hash_passwords
+from .db import get_conn
+from .models import _ATTENDANCE_UPSERT, _SCORE_UPSERT, create_users_bulk, existing_emails_and_matrics
+
+CHUNK_ROWS = 5000
+MAX_ERRORS = 1000   # stop collecting (but keep counting) past this many bad rows
+
+SCORE_COLUMNS = ["matric_no", "course_code", "component", "score"]
+ATTENDANCE_COLUMNS = ["matric_no", "course_code", "class_date", "present"]
+COMPONENTS = {"test", "assignment", "exam"}
+ROSTER_COLUMNS = ["full_name", "email"]
+ROLES = {"student", "lecturer", "admin"}
+LEVELS = {"ND1", "ND2", "HND1", "HND2"}
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+PRESENT_VALUES = {"1": 1, "present": 1, "p": 1, "yes": 1, "true": 1,
+                  "0": 0, "absent": 0, "a": 0, "no": 0, "false": 0}
+
+
+class ImportReport:
+    """Running totals for one import; errors are (row number, message)."""
+
+    __slots__ = ("rows", "written", "failed", "errors")
+
+    def __init__(self):
+        self.rows = 0
+        self.written = 0
+        self.failed = 0
+        self.errors = []
+
+    def reject(self, row_numbers, message):
+        self.failed += len(row_numbers)
+        room = MAX_ERRORS - len(self.errors)
+        if room > 0:
+            self.errors.extend((int(n), message) for n in row_numbers[:room])
+
+    def error_frame(self):
+        return pd.DataFrame(self.errors, columns=["Row", "Error"])
+
+
+# ----------------- Reading -----------------
+def read_chunks(upload, name: str = None, chunk_rows: int = CHUNK_ROWS):
+    """
+    Yield DataFrames of at most chunk_rows rows (all columns as text, headers
+    lower-cased). CSV is streamed; Excel needs openpyxl and is sliced after
+    loading, since xlsx cannot be read incrementally by pandas.
+    """
+    name = (name or getattr(upload, "name", "") or "").lower()
+    if name.endswith((".xlsx", ".xls")):
+        try:
+            sheet = pd.read_excel(upload, dtype=str)
+        except ImportError as e:
+            raise ValueError("Excel import needs the openpyxl package; upload a CSV instead.") from e
+        frames = (sheet.iloc[i:i + chunk_rows] for i in range(0, len(sheet), chunk_rows))
+    else:
+        frames = pd.read_csv(upload, dtype=str, chunksize=chunk_rows, skipinitialspace=True)
+    for df in frames:
+        df.columns = [str(c).strip().lower().replace(" ", "_") for c in df.columns]
+        yield df
+
+
+def _lookups(session, semester):
+    with get_conn() as conn:
+        students = dict(conn.execute(
+            "SELECT UPPER(matric_no), id FROM users WHERE role='student' AND matric_no IS NOT NULL").fetchall())
+        courses = dict(conn.execute("SELECT UPPER(code), id FROM courses").fetchall())
+        enrolled = None
+        if session and semester:
+            enrolled = {(r[0], r[1]) for r in conn.execute(
+                "SELECT student_id, course_id FROM enrollments WHERE session=? AND semester=?",
+                (session, semester))}
+    return students, courses, enrolled
+
+
+def _resolve_keys(df, report, students, courses, enrolled, allowed_course_ids):
+    """Map matric / course columns to ids; drop (and report) rows that don't resolve."""
+    rows = df["_row"].to_numpy()
+    sid = df["matric_no"].fillna("").str.strip().str.upper().map(students)
+    cid = df["course_code"].fillna("").str.strip().str.upper().map(courses)
+
+    bad = sid.isna().to_numpy()
+    report.reject(rows[bad], "Unknown matric number")
+    ok = ~bad
+    bad = ok & cid.isna().to_numpy()
+    report.reject(rows[bad], "Unknown course code")
+    ok &= ~bad
+    if allowed_course_ids is not None:
+        bad = ok & ~cid.isin(allowed_course_ids).to_numpy()
+        report.reject(rows[bad], "You do not teach this course this semester")
+        ok &= ~bad
+    if enrolled is not None:
+        pairs = np.fromiter(((s, c) in enrolled for s, c in zip(sid, cid)), dtype=bool, count=len(df))
+        bad = ok & ~pairs
+        report.reject(rows[bad], "Student is not enrolled in this course")
+        ok &= ~bad
+
+    df = df.assign(student_id=sid, course_id=cid)[ok]
+    return df.astype({"student_id": "int64", "course_id": "int64"})
+
+
+def _check_columns(df, required):
+    missing = [c for c in required if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}. Expected: {', '.join(required)}.")
+
+
+def _run(upload, required, validate, sql, session, semester, allowed_course_ids, name, chunk_rows):
+    report = ImportReport()
+    students, courses, enrolled = _lookups(session, semester)
+    allowed = None if allowed_course_ids is None else set(allowed_course_ids)
+    first_row = 2  # row 1 is the header, as a spreadsheet user would count
+
+    # the live database: the pooled interactive connection (synchronous=NORMAL), so a
+    # chunk counted as written survives a crash; "bulk-import" is for offline loaders only
+    with get_conn() as conn:
+        for df in read_chunks(upload, name, chunk_rows):
+            _check_columns(df, required)
+            df = df.assign(_row=np.arange(first_row, first_row + len(df)))
+            first_row += len(df)
+            report.rows += len(df)
+
+            df = _resolve_keys(df, report, students, courses, enrolled, allowed)
+            params = validate(df, report)
+            if params:
+                conn.executemany(sql, params)
+                conn.commit()
+                report.written += len(params)
+    return report
+
+
+# ----------------- Scores -----------------
+def import_scores(upload, lecturer_id: int, session: str = None, semester: str = None,
+                  allowed_course_ids=None, name: str = None, chunk_rows: int = CHUNK_ROWS) -> ImportReport:
+    """
+    Upsert scores from a sheet. With session/semester, students must be
+    enrolled in the course that term; allowed_course_ids limits which
+    courses may be written (e.g. a lecturer's own courses).
+    """
+    def validate(df, report):
+        rows = df["_row"].to_numpy()
+        component = df["component"].fillna("").str.strip().str.lower()
+        score = pd.to_numeric(df["score"], errors="coerce")
+        # a blank attempt means 1; anything else must be a whole number
+        raw_attempt = (df["attempt"].fillna("").str.strip() if "attempt" in df.columns
+                       else pd.Series("", index=df.index))
+        attempt = pd.to_numeric(raw_attempt.where(raw_attempt != "", "1"), errors="coerce")
+
+        bad = ~component.isin(COMPONENTS).to_numpy()
+        report.reject(rows[bad], "Component must be test, assignment or exam")
+        ok = ~bad
+        bad = ok & ~score.between(0, 100).to_numpy()
+        report.reject(rows[bad], "Score must be a number from 0 to 100")
+        ok &= ~bad
+        bad = ok & ~((attempt >= 1) & (attempt % 1 == 0)).to_numpy()
+        report.reject(rows[bad], "Attempt must be a whole number, 1 or more")
+        ok &= ~bad
+
+        attempt = attempt.where(ok, 1).astype("int64")
+        return list(zip(
+            df["course_id"][ok].tolist(), df["student_id"][ok].tolist(), component[ok].tolist(),
+            attempt[ok].tolist(), score[ok].astype(float).tolist(), [lecturer_id] * int(ok.sum()),
+        ))
+
+    return _run(upload, SCORE_COLUMNS, validate, _SCORE_UPSERT,
+                session, semester, allowed_course_ids, name, chunk_rows)
+
+
+# ----------------- Attendance -----------------
+def import_attendance(upload, marked_by: int, session: str = None, semester: str = None,
+                      allowed_course_ids=None, name: str = None, chunk_rows: int = CHUNK_ROWS) -> ImportReport:
+    """Upsert attendance marks from a sheet (present: 1/0, present/absent, yes/no)."""
+    def validate(df, report):
+        rows = df["_row"].to_numpy()
+        dates = pd.to_datetime(df["class_date"].str.strip(), errors="coerce", format="mixed")
+        present = df["present"].fillna("").str.strip().str.lower().map(PRESENT_VALUES)
+
+        bad = dates.isna().to_numpy()
+        report.reject(rows[bad], "Class date is not a valid date")
+        ok = ~bad
+        bad = ok & present.isna().to_numpy()
+        report.reject(rows[bad], "Present must be 1/0, present/absent or yes/no")
+        ok &= ~bad
+
+        return list(zip(
+            df["course_id"][ok].tolist(), df["student_id"][ok].tolist(),
+            dates[ok].dt.strftime("%Y-%m-%d").tolist(), present[ok].astype(int).tolist(),
+            [marked_by] * int(ok.sum()),
+        ))
+
+    return _run(upload, ATTENDANCE_COLUMNS, validate, _ATTENDANCE_UPSERT,
+                session, semester, allowed_course_ids, name, chunk_rows)
+
+
+# ----------------- Users -----------------
+def import_roster(upload, default_role: str = "student", name: str = None, progress=None):
+    """
+    Create accounts from a roster. Rows with a bad or duplicate email / matric
+    number (in the file or already registered) are reported and skipped.
+    Missing passwords get a random temporary one; passwords are hashed in a
+    process pool and the users inserted with executemany.
+
+    progress(stage, done, total) is called while hashing and inserting.
+    Returns (ImportReport, DataFrame of created accounts); "Temporary Password"
+    is only filled in for generated passwords, and left blank when the sheet
+    supplied one.
+    """
+    report = ImportReport()
+    taken_emails, taken_matrics = existing_emails_and_matrics()
+    seen_emails, seen_matrics = set(), set()
+    accepted = []
+
+    first_row = 2
+    for df in read_chunks(upload, name):
+        _check_columns(df, ROSTER_COLUMNS)
+        df = df.reindex(columns=ROSTER_COLUMNS + ["role", "matric_no", "level", "password"])
+        df = df.apply(lambda col: col.fillna("").astype(str).str.strip())
+        report.rows += len(df)
+        for row_no, r in enumerate(df.itertuples(index=False), first_row):
+            email, matric = r.email.lower(), r.matric_no.upper() or None
+            role = (r.role or default_role).lower()
+            level = r.level.upper() or None
+            if not r.full_name:
+                error = "Full name is required"
+            elif not EMAIL_RE.match(email):
+                error = "Invalid email"
+            elif role not in ROLES:
+                error = "Role must be student, lecturer or admin"
+            elif email in taken_emails:
+                error = "Duplicate email (already registered)"
+            elif email in seen_emails:
+                error = "Duplicate email (earlier in this file)"
+            elif role == "student" and not matric:
+                error = "Students need a matric number"
+            elif role == "student" and level not in LEVELS:
+                error = "Level must be ND1, ND2, HND1 or HND2"
+            elif matric and matric in taken_matrics:
+                error = "Duplicate matric number (already registered)"
+            elif matric and matric in seen_matrics:
+                error = "Duplicate matric number (earlier in this file)"
+            elif r.password and len(r.password) < 6:
+                error = "Password must be at least 6 characters"
+            else:
+                error = None
+            if error:
+                report.reject([row_no], error)
+                continue
+            seen_emails.add(email)
+            if matric:
+                seen_matrics.add(matric)
+            if role != "student":
+                matric, level = None, None
+            temporary = "" if r.password else secrets.token_urlsafe(8)
+            accepted.append((r.full_name, email, role, matric, level, r.password or temporary, temporary))
+        first_row += len(df)
+
+    hashes = hash_passwords([a[5] for a in accepted],
+                            progress=progress and (lambda d, t: progress("hashing", d, t)))
+    report.written = create_users_bulk(
+        [(n, e, role, h, m, lvl) for (n, e, role, m, lvl, _, _), h in zip(accepted, hashes)],
+        progress=progress and (lambda d, t: progress("inserting", d, t)),
+    )
+    # only passwords the importer made up are reported; ones from the sheet are never echoed
+    created = pd.DataFrame([a[:5] + a[6:] for a in accepted],
+                           columns=["Full Name", "Email", "Role", "Matric No", "Level", "Temporary Password"])
+    return report, created
+
+
+def template_csv(kind: str) -> str:
+    """Header-only CSV for the download-a-template buttons."""
+    cols = {
+        "scores": SCORE_COLUMNS + ["attempt"],
+        "attendance": ATTENDANCE_COLUMNS,
+        "roster": ROSTER_COLUMNS + ["role", "matric_no", "level", "password"],
+    }[kind]
+    return ",".join(cols) + "\n"
@@ -0,0 +1,673 @@
+"""
+Versioned schema migrations for secure.db.
+
+Each migration is (version, name, step) where step is either a SQL script
+(run atomically) or a function taking the connection (used for large
+backfills, which commit in batches via backfill_in_batches: migrations 2,
+4, 6 and 9). Applied versions are recorded in the schema_version table, so
+running migrate() again is a no-op.
+
+    python -m utils.migrations            # apply pending migrations
+    python -m utils.migrations --status   # list applied / pending versions
+    python -m utils.migrations --rebuild-rollups   # recompute derived tables
+"""
+import sys
+import threading
+from . import db
+from .db import get_conn
+
+
+BASELINE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT UNIQUE NOT NULL,
+    full_name TEXT NOT NULL,
+    matric_no TEXT UNIQUE,
+    role TEXT CHECK(role IN ('admin','lecturer','student')) NOT NULL,
+    password_hash BLOB NOT NULL,
+    level TEXT,
+    profile_pic TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    is_active INTEGER DEFAULT 0,
+    CONSTRAINT student_matric CHECK (
+        (role = 'student' AND matric_no IS NOT NULL AND level IS NOT NULL) OR
+        (role IN ('lecturer','admin') AND matric_no IS NULL AND level IS NULL)
+    )
+);
+
+CREATE TABLE IF NOT EXISTS courses (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  code TEXT UNIQUE NOT NULL,
+  title TEXT NOT NULL,
+  units INTEGER NOT NULL,
+  level TEXT NOT NULL,
+  session TEXT DEFAULT '2024/2025',
+  semester TEXT NOT NULL DEFAULT 'First',
+  is_active INTEGER DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS enrollments (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  student_id INTEGER NOT NULL,
+  course_id INTEGER NOT NULL,
+  session TEXT NOT NULL,
+  semester TEXT NOT NULL,
+  created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY(student_id) REFERENCES users(id) ON DELETE CASCADE,
+  FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE,
+  UNIQUE(student_id, course_id, session, semester)
+);
+
+CREATE TABLE IF NOT EXISTS lecturer_courses (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  lecturer_id INTEGER NOT NULL,
+  course_id INTEGER NOT NULL,
+  session TEXT NOT NULL,
+  semester TEXT NOT NULL,
+  FOREIGN KEY(lecturer_id) REFERENCES users(id) ON DELETE CASCADE,
+  FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE,
+  UNIQUE(lecturer_id, course_id, session, semester)
+);
+
+CREATE TABLE IF NOT EXISTS attendance (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  course_id INTEGER NOT NULL,
+  student_id INTEGER NOT NULL,
+  class_date TEXT NOT NULL,
+  present INTEGER NOT NULL,
+  marked_by INTEGER,
+  FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE,
+  FOREIGN KEY(student_id) REFERENCES users(id) ON DELETE CASCADE,
+  FOREIGN KEY(marked_by) REFERENCES users(id) ON DELETE SET NULL,
+  UNIQUE(course_id, student_id, class_date)
+);
+
+CREATE TABLE IF NOT EXISTS scores (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  course_id INTEGER NOT NULL,
+  student_id INTEGER NOT NULL,
+  component TEXT CHECK(component IN ('test','assignment','exam')) NOT NULL,
+  score REAL NOT NULL,
+  entered_by INTEGER,
+  created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE,
+  FOREIGN KEY(student_id) REFERENCES users(id) ON DELETE CASCADE,
+  FOREIGN KEY(entered_by) REFERENCES users(id) ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS student_gpa (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id INTEGER NOT NULL,
+    session TEXT NOT NULL,
+    semester TEXT NOT NULL,
+    gpa REAL NOT NULL DEFAULT 0.0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY(student_id) REFERENCES users(id) ON DELETE CASCADE,
+    UNIQUE(student_id, session, semester)
+);
+
+CREATE TABLE IF NOT EXISTS resources (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,              -- resource title (e.g., "Lecture Notes Week 1")
+    description TEXT,                 -- optional extra info
+    file_path TEXT NOT NULL,          -- file location on disk or URL
+    course_id INTEGER NOT NULL,       -- link to course
+    lecturer_id INTEGER NOT NULL,     -- who uploaded it
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE,
+    FOREIGN KEY(lecturer_id) REFERENCES users(id) ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS messages (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  sender_id INTEGER NOT NULL,
+  course_id INTEGER NOT NULL,
+  body TEXT NOT NULL,
+  created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY(sender_id) REFERENCES users(id) ON DELETE CASCADE,
+  FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS notifications (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  title TEXT NOT NULL,
+  message TEXT NOT NULL,
+  user_id INTEGER,
+  course_id INTEGER,
+  created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE,
+  FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE
+);
+"""
+
+
+# Recompute a user's unread_count from scratch, one index range per audience
+# as in models.get_notification_feed ({user} is an SQL expression for the user
+# id). Used by the migration backfill, the enrollment triggers and
+# models.rebuild_unread_counts().
+UNREAD_RECOUNT = """
+    UPDATE notification_state SET unread_count = (
+        SELECT COUNT(*) FROM notifications n
+        WHERE n.user_id IS NULL AND n.course_id IS NULL AND n.id > notification_state.last_read_id
+          AND NOT EXISTS (SELECT 1 FROM notification_reads r
+                          WHERE r.user_id = notification_state.user_id AND r.notification_id = n.id)
+    ) + (
+        SELECT COUNT(*) FROM notifications n
+        WHERE n.user_id = notification_state.user_id AND n.id > notification_state.last_read_id
+          AND NOT EXISTS (SELECT 1 FROM notification_reads r
+                          WHERE r.user_id = notification_state.user_id AND r.notification_id = n.id)
+    ) + (
+        SELECT COUNT(*) FROM notifications n
+        WHERE n.user_id IS NULL AND n.id > notification_state.last_read_id AND n.course_id IN (
+              SELECT course_id FROM enrollments WHERE student_id = notification_state.user_id
+              UNION SELECT course_id FROM lecturer_courses WHERE lecturer_id = notification_state.user_id)
+          AND NOT EXISTS (SELECT 1 FROM notification_reads r
+                          WHERE r.user_id = notification_state.user_id AND r.notification_id = n.id)
+    )
+    WHERE notification_state.user_id = {user};
+"""
+
+# ----------------- Batched backfills -----------------
+# Callable migrations: DDL in short transactions, row work through
+# backfill_in_batches() so a live WAL database keeps serving writes.
+
+_DELETE_OLDER_SCORE_DUPLICATES = """
+    DELETE FROM scores
+    WHERE EXISTS (
+        SELECT 1 FROM scores s2
+        WHERE s2.student_id = scores.student_id AND s2.course_id = scores.course_id
+          AND s2.component = scores.component AND s2.attempt = scores.attempt
+          AND s2.id > scores.id
+    )
+"""
+
+
+def _unique_score_per_attempt(conn):
+    """upsert_score used to append a row on every save; keep the latest one per attempt."""
+    if "attempt" not in {r[1] for r in conn.execute("PRAGMA table_info(scores)")}:
+        conn.executescript("""
+            BEGIN IMMEDIATE;
+            ALTER TABLE scores ADD COLUMN attempt INTEGER NOT NULL DEFAULT 1;
+            COMMIT;
+        """)
+    last = conn.execute("SELECT COALESCE(MAX(id), 0) FROM scores").fetchone()[0]
+    backfill_in_batches(conn, "scores", _DELETE_OLDER_SCORE_DUPLICATES + " AND id BETWEEN :lo AND :hi")
+    # rows saved during the batches (e.g. by a process still on the old code) can
+    # have re-created duplicates; clear those groups and add the index atomically
+    conn.executescript(f"""
+        BEGIN IMMEDIATE;
+        {_DELETE_OLDER_SCORE_DUPLICATES}
+          AND (course_id, student_id, component, attempt) IN (
+              SELECT course_id, student_id, component, attempt FROM scores WHERE id > {int(last)});
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_scores_course_student_component_attempt
+            ON scores(course_id, student_id, component, attempt);
+        COMMIT;
+    """)
+
+
+# Backfills that run with their sync triggers already live record how far they
+# have got here; until a row is covered the triggers leave it alone and the
+# batch picks up its current state when it gets there.
+_BACKFILL_PROGRESS = """
+        DROP TABLE IF EXISTS backfill_progress;
+        CREATE TABLE backfill_progress (
+            name TEXT PRIMARY KEY, snapshot INTEGER NOT NULL, done_through INTEGER NOT NULL);
+"""
+
+
+def _backfilled(row: str, name: str) -> str:
+    """SQL condition: {row}.id is above backfill `name`'s snapshot or inside a finished batch."""
+    return (f"({row}.id > (SELECT snapshot FROM backfill_progress WHERE name = '{name}')"
+            f" OR {row}.id <= (SELECT done_through FROM backfill_progress WHERE name = '{name}'))")
+
+
+def _progress(name: str) -> str:
+    return f"UPDATE backfill_progress SET done_through = :hi WHERE name = '{name}'"
+
+
+_ATTENDANCE_ROLLUP_SCHEMA = """
+        -- per student/course attendance totals, kept current by _attendance_rollup_triggers()
+        CREATE TABLE IF NOT EXISTS attendance_rollup (
+            student_id INTEGER NOT NULL,
+            course_id INTEGER NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            present INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (student_id, course_id),
+            FOREIGN KEY(student_id) REFERENCES users(id) ON DELETE CASCADE,
+            FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE
+        ) WITHOUT ROWID;
+"""
+
+
+def _attendance_rollup_triggers(guarded: bool = False) -> str:
+    when_new = f" WHEN {_backfilled('NEW', 'attendance')}" if guarded else ""
+    when_old = f" WHEN {_backfilled('OLD', 'attendance')}" if guarded else ""
+    return f"""
+        DROP TRIGGER IF EXISTS trg_attendance_rollup_insert;
+        DROP TRIGGER IF EXISTS trg_attendance_rollup_delete;
+        DROP TRIGGER IF EXISTS trg_attendance_rollup_update;
+
+        CREATE TRIGGER trg_attendance_rollup_insert
+        AFTER INSERT ON attendance{when_new}
+        BEGIN
+            INSERT INTO attendance_rollup (student_id, course_id, total, present)
+            VALUES (NEW.student_id, NEW.course_id, 1, NEW.present)
+            ON CONFLICT(student_id, course_id)
+            DO UPDATE SET total = total + 1, present = present + excluded.present;
+        END;
+
+        CREATE TRIGGER trg_attendance_rollup_delete
+        AFTER DELETE ON attendance{when_old}
+        BEGIN
+            UPDATE attendance_rollup
+            SET total = total - 1, present = present - OLD.present
+            WHERE student_id = OLD.student_id AND course_id = OLD.course_id;
+        END;
+
+        CREATE TRIGGER trg_attendance_rollup_update
+        AFTER UPDATE OF present, student_id, course_id ON attendance{when_old}
+        BEGIN
+            UPDATE attendance_rollup
+            SET total = total - 1, present = present - OLD.present
+            WHERE student_id = OLD.student_id AND course_id = OLD.course_id;
+            INSERT INTO attendance_rollup (student_id, course_id, total, present)
+            VALUES (NEW.student_id, NEW.course_id, 1, NEW.present)
+            ON CONFLICT(student_id, course_id)
+            DO UPDATE SET total = total + 1, present = present + excluded.present;
+        END;
+"""
+
+
+def _attendance_rollup(conn):
+    """Create attendance_rollup and its triggers, then total the existing attendance in batches."""
+    conn.executescript(
+        "BEGIN IMMEDIATE;\n" + _ATTENDANCE_ROLLUP_SCHEMA + "DELETE FROM attendance_rollup;\n"
+        + _BACKFILL_PROGRESS
+        + "INSERT INTO backfill_progress SELECT 'attendance', COALESCE(MAX(id), 0), 0 FROM attendance;\n"
+        + _attendance_rollup_triggers(guarded=True) + "COMMIT;"
+    )
+    snapshot = conn.execute("SELECT snapshot FROM backfill_progress WHERE name = 'attendance'").fetchone()[0]
+    backfill_in_batches(conn, "attendance", [f"""
+        INSERT INTO attendance_rollup (student_id, course_id, total, present)
+        SELECT student_id, course_id, COUNT(*), SUM(present)
+        FROM attendance
+        WHERE id BETWEEN :lo AND :hi AND id <= {int(snapshot)}
+        GROUP BY student_id, course_id
+        ON CONFLICT(student_id, course_id)
+        DO UPDATE SET total = total + excluded.total, present = present + excluded.present
+    """, _progress("attendance")])
+    conn.executescript(
+        "BEGIN IMMEDIATE;\n" + _attendance_rollup_triggers() + "DROP TABLE backfill_progress;\nCOMMIT;"
+    )
+
+
+_NOTIFICATION_STATE_SCHEMA = """
+        -- per-user read state: everything up to last_read_id is read ("mark all
+        -- read"), later ones are read if they have a notification_reads row.
+        -- unread_count is kept current by the triggers below
+        CREATE TABLE IF NOT EXISTS notification_state (
+            user_id INTEGER PRIMARY KEY,
+            last_read_id INTEGER NOT NULL DEFAULT 0,
+            unread_count INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS notification_reads (
+            user_id INTEGER NOT NULL,
+            notification_id INTEGER NOT NULL,
+            read_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, notification_id),
+            FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE,
+            FOREIGN KEY(notification_id) REFERENCES notifications(id) ON DELETE CASCADE
+        ) WITHOUT ROWID;
+
+        -- fan a new notification out to its audience's counters
+        CREATE TRIGGER IF NOT EXISTS trg_notification_unread_insert
+        AFTER INSERT ON notifications
+        BEGIN
+            UPDATE notification_state SET unread_count = unread_count + 1
+            WHERE NEW.user_id IS NOT NULL AND user_id = NEW.user_id;
+            UPDATE notification_state SET unread_count = unread_count + 1
+            WHERE NEW.user_id IS NULL AND NEW.course_id IS NOT NULL AND user_id IN (
+                SELECT student_id FROM enrollments WHERE course_id = NEW.course_id
+                UNION SELECT lecturer_id FROM lecturer_courses WHERE course_id = NEW.course_id);
+            UPDATE notification_state SET unread_count = unread_count + 1
+            WHERE NEW.user_id IS NULL AND NEW.course_id IS NULL;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_notification_unread_read
+        AFTER INSERT ON notification_reads
+        BEGIN
+            UPDATE notification_state SET unread_count = MAX(unread_count - 1, 0)
+            WHERE user_id = NEW.user_id;
+        END;
+
+        -- a new account starts with every system-wide notification unread
+        CREATE TRIGGER IF NOT EXISTS trg_notification_state_user
+        AFTER INSERT ON users
+        BEGIN
+            INSERT OR IGNORE INTO notification_state (user_id, unread_count)
+            SELECT NEW.id, COUNT(*) FROM notifications WHERE user_id IS NULL AND course_id IS NULL;
+        END;
+
+        -- joining or leaving a course changes which course notifications a user sees
+        CREATE TRIGGER IF NOT EXISTS trg_notification_unread_enroll
+        AFTER INSERT ON enrollments
+        BEGIN
+            {recount_new_student}
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_notification_unread_unenroll
+        AFTER DELETE ON enrollments
+        BEGIN
+            {recount_old_student}
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_notification_unread_allocate
+        AFTER INSERT ON lecturer_courses
+        BEGIN
+            {recount_new_lecturer}
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_notification_unread_deallocate
+        AFTER DELETE ON lecturer_courses
+        BEGIN
+            {recount_old_lecturer}
+        END;
+""".format(
+        recount_new_student=UNREAD_RECOUNT.format(user="NEW.student_id"),
+        recount_old_student=UNREAD_RECOUNT.format(user="OLD.student_id"),
+        recount_new_lecturer=UNREAD_RECOUNT.format(user="NEW.lecturer_id"),
+        recount_old_lecturer=UNREAD_RECOUNT.format(user="OLD.lecturer_id"),
+)
+
+
+def _notification_read_state(conn):
+    """
+    Create the read-state tables and triggers, then give every user a row and
+    count their unread notifications a batch of users at a time. The recount
+    sets absolute values, so trigger updates to users not reached yet are
+    simply overwritten by their batch.
+    """
+    conn.executescript("BEGIN IMMEDIATE;\n" + _NOTIFICATION_STATE_SCHEMA + "COMMIT;")
+    # read state used to live in the browser session, so everything starts unread
+    recount = UNREAD_RECOUNT.format(user="notification_state.user_id").rstrip().rstrip(";")
+    backfill_in_batches(conn, "users", [
+        "INSERT OR IGNORE INTO notification_state (user_id) SELECT id FROM users WHERE id BETWEEN :lo AND :hi",
+        recount + " AND notification_state.user_id BETWEEN :lo AND :hi",
+    ])
+
+
+# FTS5 indexes over the text columns (external content: the text itself stays
+# in the base tables), kept in sync by the triggers from _fts_triggers()
+_FTS_SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+            body, content='messages', content_rowid='id', tokenize='unicode61 remove_diacritics 2');
+        CREATE VIRTUAL TABLE IF NOT EXISTS notifications_fts USING fts5(
+            title, message, content='notifications', content_rowid='id', tokenize='unicode61 remove_diacritics 2');
+        CREATE VIRTUAL TABLE IF NOT EXISTS resources_fts USING fts5(
+            title, description, content='resources', content_rowid='id', tokenize='unicode61 remove_diacritics 2');
+"""
+
+_FTS_TABLES = {"messages": "body", "notifications": "title, message", "resources": "title, description"}
+
+
+def _fts_triggers(guarded: bool = False) -> str:
+    """
+    Insert / delete / update triggers for every FTS table. The update trigger
+    also covers the outbox, which rewrites message when it folds a repeat.
+
+    While the backfill runs (guarded=True) they only touch rows the index
+    already covers (see _backfilled): an FTS5 'delete' for a row that was never
+    indexed corrupts the index.
+    """
+    sql = []
+    for table, columns in _FTS_TABLES.items():
+        cols = [c.strip() for c in columns.split(",")]
+        old = ", ".join(f"OLD.{c}" for c in cols)
+        new = ", ".join(f"NEW.{c}" for c in cols)
+        when = {row: f" WHEN {_backfilled(row, table)}" if guarded else "" for row in ("OLD", "NEW")}
+        sql.append(f"""
+        CREATE TRIGGER trg_{table}_fts_insert AFTER INSERT ON {table}{when["NEW"]} BEGIN
+            INSERT INTO {table}_fts (rowid, {columns}) VALUES (NEW.id, {new});
+        END;
+        CREATE TRIGGER trg_{table}_fts_delete AFTER DELETE ON {table}{when["OLD"]} BEGIN
+            INSERT INTO {table}_fts ({table}_fts, rowid, {columns}) VALUES ('delete', OLD.id, {old});
+        END;
+        CREATE TRIGGER trg_{table}_fts_update AFTER UPDATE OF {columns} ON {table}{when["OLD"]} BEGIN
+            INSERT INTO {table}_fts ({table}_fts, rowid, {columns}) VALUES ('delete', OLD.id, {old});
+            INSERT INTO {table}_fts (rowid, {columns}) VALUES (NEW.id, {new});
+        END;""")
+    return "".join(sql) + "\n"
+
+
+def _drop_fts_triggers() -> str:
+    return "".join(
+        f"DROP TRIGGER IF EXISTS trg_{t}_fts_{op};\n" for t in _FTS_TABLES for op in ("insert", "delete", "update"))
+
+
+def _full_text_search(conn):
+    """Create the FTS5 tables, index the existing rows in batches, then install the sync triggers."""
+    # a rerun after a crash starts over
+    conn.executescript(
+        "BEGIN IMMEDIATE;\n" + _drop_fts_triggers()
+        + "".join(f"DROP TABLE IF EXISTS {t}_fts;\n" for t in _FTS_TABLES)
+        + _FTS_SCHEMA + _BACKFILL_PROGRESS
+        + "".join(f"INSERT INTO backfill_progress SELECT '{t}', COALESCE(MAX(id), 0), 0 FROM {t};\n" for t in _FTS_TABLES)
+        + _fts_triggers(guarded=True) + "COMMIT;"
+    )
+    snapshot = dict(conn.execute("SELECT name, snapshot FROM backfill_progress").fetchall())
+    for table, columns in _FTS_TABLES.items():
+        backfill_in_batches(conn, table, [f"""
+            INSERT INTO {table}_fts (rowid, {columns})
+            SELECT id, {columns} FROM {table}
+            WHERE id BETWEEN :lo AND :hi AND id <= {int(snapshot[table])}
+        """, _progress(table)])
+    # every row is indexed now: swap in the unguarded triggers
+    conn.executescript(
+        "BEGIN IMMEDIATE;\n" + _drop_fts_triggers() + _fts_triggers()
+        + "DROP TABLE backfill_progress;\nCOMMIT;"
+    )
+
+
+MIGRATIONS = [
+    # the schema that db_init.py (and the student_gpa helper in other.py) used to create
+    (0, "baseline schema", BASELINE_SCHEMA),
+    (1, "hot-path secondary indexes", """
+        -- notifications feed: personal / system (user_id) and course (course_id), newest first
+        CREATE INDEX IF NOT EXISTS idx_notifications_user_created
+            ON notifications(user_id, created_at);
+        CREATE INDEX IF NOT EXISTS idx_notifications_course_created
+            ON notifications(course_id, created_at);
+
+        -- get_scores / calculate_gpa: every score of a student, per course and component
+        CREATE INDEX IF NOT EXISTS idx_scores_student_course
+            ON scores(student_id, course_id, component, score);
+
+        -- attendance_summary / get_attendance / percentage_attendance
+        CREATE INDEX IF NOT EXISTS idx_attendance_student_course
+            ON attendance(student_id, course_id, present);
+
+        -- Group Messaging thread: one course, ordered by created_at
+        CREATE INDEX IF NOT EXISTS idx_messages_course_created
+            ON messages(course_id, created_at);
+
+        -- list_resources_for_course / myCourses resources
+        CREATE INDEX IF NOT EXISTS idx_resources_course_created
+            ON resources(course_id, created_at);
+
+        -- class lists (list_students_in_course, list_course_students)
+        CREATE INDEX IF NOT EXISTS idx_enrollments_course_term
+            ON enrollments(course_id, session, semester);
+
+        -- list_course_lecturers / delete_course
+        CREATE INDEX IF NOT EXISTS idx_lecturer_courses_course
+            ON lecturer_courses(course_id, session, semester);
+
+        -- count_users_by_role / get_all_lecturers
+        CREATE INDEX IF NOT EXISTS idx_users_role_name
+            ON users(role, full_name);
+
+        -- course catalogue lookups
+        CREATE INDEX IF NOT EXISTS idx_courses_level_code
+            ON courses(level, is_active, code);
+        CREATE INDEX IF NOT EXISTS idx_courses_term_code
+            ON courses(session, semester, code);
+    """),
+    (2, "attendance rollup table", _attendance_rollup),
+    (3, "risk_flags table", """
+        -- output of the at-risk batch scan (utils/risk.py); one run replaces a term's flags
+        CREATE TABLE IF NOT EXISTS risk_flags (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER NOT NULL,
+            course_id INTEGER,                -- NULL for term-level flags (GPA drop)
+            session TEXT NOT NULL,
+            semester TEXT NOT NULL,
+            kind TEXT CHECK(kind IN ('attendance','ca','gpa_drop')) NOT NULL,
+            severity TEXT CHECK(severity IN ('warning','critical')) NOT NULL,
+            value REAL,
+            threshold REAL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(student_id) REFERENCES users(id) ON DELETE CASCADE,
+            FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE
+        );
+        CREATE INDEX IF NOT EXISTS idx_risk_flags_term
+            ON risk_flags(session, semester, kind);
+        CREATE INDEX IF NOT EXISTS idx_risk_flags_course
+            ON risk_flags(course_id, session, semester);
+        CREATE INDEX IF NOT EXISTS idx_risk_flags_student
+            ON risk_flags(student_id, session, semester);
+    """),
+    (4, "unique score per attempt", _unique_score_per_attempt),
+    (5, "notification feed indexes", """
+        -- get_notification_feed pages on id (keyset), one index range per audience:
+        -- personal = (user_id, id); course and system = (course_id, user_id, id)
+        DROP INDEX IF EXISTS idx_notifications_user_created;
+        DROP INDEX IF EXISTS idx_notifications_course_created;
+        CREATE INDEX IF NOT EXISTS idx_notifications_user_feed
+            ON notifications(user_id, id);
+        CREATE INDEX IF NOT EXISTS idx_notifications_course_feed
+            ON notifications(course_id, user_id, id);
+    """),
+    (6, "notification read state", _notification_read_state),
+    (7, "notification event count", """
+        -- utils/outbox.py folds repeated (course, title) events into one row
+        ALTER TABLE notifications ADD COLUMN event_count INTEGER NOT NULL DEFAULT 1;
+    """),
+    (8, "message thread index", """
+        -- get_messages_after / get_messages_before page a course thread by id
+        DROP INDEX IF EXISTS idx_messages_course_created;
+        CREATE INDEX IF NOT EXISTS idx_messages_course_id
+            ON messages(course_id, id);
+    """),
+    (9, "full-text search", _full_text_search),
+    (10, "notification read lookups", """
+        -- utils/outbox.py only folds a repeat into a row nobody in its audience has
+        -- read: "anyone read past this id" and "any read of this notification" are lookups
+        CREATE INDEX IF NOT EXISTS idx_notification_state_last_read
+            ON notification_state(last_read_id);
+        CREATE INDEX IF NOT EXISTS idx_notification_reads_notification
+            ON notification_reads(notification_id);
+    """),
+]
+
+
+_lock = threading.Lock()
+_done = set()   # database paths already migrated by this process
+
+
+def _ensure_version_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+
+
+def applied_versions(conn):
+    _ensure_version_table(conn)
+    return {r[0] for r in conn.execute("SELECT version FROM schema_version")}
+
+
+def backfill_in_batches(conn, table: str, sql: str, batch_size: int = 5000):
+    """
+    Run `sql` over `table` one rowid range at a time, committing after each
+    batch so a multi-gigabyte backfill never holds the write lock for long
+    (WAL readers keep reading, other writers get a turn between batches).
+
+    `sql` must be idempotent and use the named parameters :lo and :hi,
+    e.g. "UPDATE scores SET attempt=1 WHERE id BETWEEN :lo AND :hi". Pass a
+    list of statements to run several in each batch's transaction (e.g. to
+    record progress alongside the row work).
+    """
+    statements = [sql] if isinstance(sql, str) else list(sql)
+    row = conn.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {table}").fetchone()
+    if row[0] is None:
+        return 0
+    lo, last, batches = row[0], row[1], 0
+    while lo <= last:
+        hi = lo + batch_size - 1
+        conn.execute("BEGIN IMMEDIATE")
+        for statement in statements:
+            conn.execute(statement, {"lo": lo, "hi": hi})
+        conn.commit()
+        lo, batches = hi + 1, batches + 1
+    return batches
+
+
+def _apply(conn, version, name, step):
+    if callable(step):
+        # long-running, batch-committing migrations: record them once they finish
+        step(conn)
+        conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (version, name))
+        conn.commit()
+        return
+    quoted = name.replace("'", "''")
+    # IMMEDIATE takes the write lock up front, so on a live WAL database we wait
+    # (busy_timeout) for the current writer instead of failing half-way through
+    conn.executescript(
+        "BEGIN IMMEDIATE;\n" + step +
+        f"\nINSERT INTO schema_version (version, name) VALUES ({int(version)}, '{quoted}');\nCOMMIT;"
+    )
+
+
+def pending_migrations(conn):
+    done = applied_versions(conn)
+    return [m for m in sorted(MIGRATIONS, key=lambda m: m[0]) if m[0] not in done]
+
+
+def migrate(force: bool = False):
+    """
+    Apply every pending migration in version order. Only runs once per
+    process unless force=True. Returns the list of versions applied.
+    """
+    if db.DB_PATH in _done and not force:
+        return []
+    with _lock:
+        if db.DB_PATH in _done and not force:
+            return []
+        applied = []
+        with get_conn() as conn:
+            for version, name, step in pending_migrations(conn):
+                _apply(conn, version, name, step)
+                applied.append(version)
+        _done.add(db.DB_PATH)
+        return applied
+
+
+if __name__ == "__main__":
+    if "--rebuild-rollups" in sys.argv:
+        from .models import rebuild_attendance_rollup, rebuild_unread_counts
+        migrate()
+        print("attendance_rollup rows:", rebuild_attendance_rollup())
+        rebuild_unread_counts()
+        print("notification unread counts rebuilt")
+    elif "--status" in sys.argv:
+        with get_conn() as conn:
+            pending = pending_migrations(conn)
+            for version, name, applied_at in conn.execute(
+                    "SELECT version, name, applied_at FROM schema_version ORDER BY version"):
+                print(f"  [x] {version:>3}  {name}  ({applied_at})")
+            for version, name, _ in pending:
+                print(f"  [ ] {version:>3}  {name}")
+    else:
+        print("Applied migrations:", migrate() or "none (schema is up to date)")
@@ -1,9 +1,16 @@
 import sqlite3
 import os
-import bcrypt
+from .auth import hash_password, verify_password
 from .db import get_conn
+from .identity import invalidate_user
+from .cache import cached, invalidate
+from .attendance import AttendanceMatrix
+from .gpa import gpas_by_group
+from .migrations import UNREAD_RECOUNT
+from .outbox import notify
 
     
+@cached("courses")
 def list_courses_for_level(level: str):
     """
     Returns all courses available for a level.
@@ -23,7 +30,8 @@ def lecturer_pick_course(lecturer_id:int, course_id:int, session:str, semester:s
     with get_conn() as conn:
         conn.execute("""INSERT OR IGNORE INTO lecturer_courses (lecturer_id,course_id,session,semester)
                         VALUES (?,?,?,?)""", (lecturer_id,course_id,session,semester))
-        
+    invalidate("lecturer_courses")
+
 def student_enrollments(student_id: int, session: str, semester: str):
     """
     Returns a list of dicts with friendly keys for the student's enrollments.
@@ -79,17 +87,78 @@ def drop_student_course(student_id: int, course_code: str, session: str, semeste
         return cur.rowcount  # number of rows deleted (0 or 1)
     
 
+# Upsert (not INSERT OR REPLACE) so the attendance_rollup triggers see an UPDATE
+# instead of a silent delete + insert when a class is re-marked.
+_ATTENDANCE_UPSERT = """
+    INSERT INTO attendance (course_id,student_id,class_date,present,marked_by)
+    VALUES (?,?,?,?,?)
+    ON CONFLICT(course_id, student_id, class_date)
+    DO UPDATE SET present=excluded.present, marked_by=excluded.marked_by
+"""
+
 def mark_attendance(course_id:int, student_id:int, class_date:str, present:bool, marked_by:int):
     with get_conn() as conn:
-        conn.execute("""INSERT OR REPLACE INTO attendance (course_id,student_id,class_date,present,marked_by)
-                        VALUES (?,?,?,?,?)""",
+        conn.execute(_ATTENDANCE_UPSERT,
                      (course_id,student_id,class_date, 1 if present else 0, marked_by))
 
-def upsert_score(course_id:int, student_id:int, component:str, score:float, lecturer_id:int):
+def mark_attendance_bulk(course_id:int, class_date:str, register:dict, marked_by:int):
+    """
+    Save a whole class register ({student_id: present}) in one transaction.
+    Returns the number of students written.
+    """
+    rows = [(course_id, student_id, class_date, 1 if present else 0, marked_by)
+            for student_id, present in register.items()]
+    if not rows:
+        return 0
+    with get_conn() as conn:
+        conn.executemany(_ATTENDANCE_UPSERT, rows)
+    return len(rows)
+
+_SCORE_UPSERT = """
+    INSERT INTO scores (course_id, student_id, component, attempt, score, entered_by)
+    VALUES (?,?,?,?,?,?)
+    ON CONFLICT(course_id, student_id, component, attempt) DO UPDATE SET
+        score=excluded.score, entered_by=excluded.entered_by, created_at=CURRENT_TIMESTAMP
+"""
+
+
+def upsert_score(course_id:int, student_id:int, component:str, score:float, lecturer_id:int, attempt:int = 1):
+    """One row per (course, student, component, attempt); re-saving overwrites it."""
     with get_conn() as conn:
-        # REPLACE will overwrite same (course,student,component,created_at is new)
-        conn.execute("""INSERT INTO scores (course_id,student_id,component,score,entered_by)
-                        VALUES (?,?,?,?,?)""", (course_id,student_id,component,score,lecturer_id))
+        conn.execute(_SCORE_UPSERT, (course_id, student_id, component, attempt, score, lecturer_id))
+
+
+def upsert_scores(course_id: int, component: str, scores: dict, lecturer_id: int,
+                  attempt: int = 1, notify_title: str = None, notify_message: str = None):
+    """
+    Save {student_id: score} for one component in a single transaction, plus
+    (optionally) a course notification, queued on the outbox so repeated saves
+    share one row. Returns the number of rows written.
+    """
+    if not scores:
+        return 0
+    with get_conn() as conn:
+        conn.executemany(_SCORE_UPSERT, [
+            (course_id, sid, component, attempt, float(score), lecturer_id)
+            for sid, score in scores.items()
+        ])
+    if notify_title:
+        notify(notify_title, notify_message or "", course_id=course_id)
+    return len(scores)
+
+
+def course_gradebook(course_id: int, session: str, semester: str, component: str, attempt: int = 1):
+    """Every enrolled student with their current score (None if not graded) for one component."""
+    with get_conn() as conn:
+        return conn.execute("""
+            SELECT u.id AS student_id, u.full_name, u.matric_no, s.score
+            FROM enrollments e
+            JOIN users u ON u.id = e.student_id
+            LEFT JOIN scores s ON s.course_id = e.course_id AND s.student_id = e.student_id
+                 AND s.component = ? AND s.attempt = ?
+            WHERE e.course_id=? AND e.session=? AND e.semester=?
+            ORDER BY u.full_name
+        """, (component, attempt, course_id, session, semester)).fetchall()
 
 
 def get_scores(student_id: int):
@@ -131,14 +200,14 @@ def get_scores(student_id: int):
 
 def percentage_attendance(student_id:int, course_id:int):
     with get_conn() as conn:
-        tot = conn.execute("SELECT COUNT(*) as n FROM attendance WHERE student_id=? AND course_id=?",(student_id,course_id)).fetchone()["n"]
-        pres = conn.execute("SELECT COUNT(*) as n FROM attendance WHERE student_id=? AND course_id=? AND present=1",(student_id,course_id)).fetchone()["n"]
-        return (pres/tot*100.0) if tot else 0.0
+        row = conn.execute("SELECT total, present FROM attendance_rollup WHERE student_id=? AND course_id=?",
+                           (student_id,course_id)).fetchone()
+        return (row["present"]/row["total"]*100.0) if row and row["total"] else 0.0
 
 def list_students_in_course(course_id:int, session:str, semester:str):
     with get_conn() as conn:
         return conn.execute("""
-        SELECT u.full_name, u.email
+        SELECT u.full_name, u.email, u.id
         FROM enrollments e JOIN users u ON u.id=e.student_id
         WHERE e.course_id=? AND e.session=? AND e.semester=?
         ORDER BY u.full_name
@@ -181,12 +250,14 @@ def all_users():
 
 
         
+_USER_INSERT = """
+    INSERT INTO users (full_name,email,role,password_hash,matric_no,level)
+    VALUES (?,?,?,?,?,?)
+"""
+
 def create_user(full_name, email, role, hashed_pwd, matric_no=None, level=None):
     with get_conn() as conn:
-        conn.execute("""
-            INSERT INTO users (full_name,email,role,password_hash,matric_no,level)
-            VALUES (?,?,?,?,?,?)
-        """, (full_name,
+        conn.execute(_USER_INSERT, (full_name,
               email,
               role,
               hashed_pwd,
@@ -197,8 +268,32 @@ def create_user(full_name, email, role, hashed_pwd, matric_no=None, level=None):
         conn.commit()
         cur = conn.execute("SELECT id FROM users WHERE email = ?", (email,))
         user_id = cur.fetchone()[0]
+    invalidate("users")
     return user_id
 
+def create_users_bulk(rows, batch_size: int = 1000, progress=None):
+    """
+    Insert (full_name, email, role, password_hash, matric_no, level) rows with
+    executemany, committing every batch_size rows. Returns the number inserted.
+    """
+    done = 0
+    with get_conn() as conn:
+        for i in range(0, len(rows), batch_size):
+            batch = rows[i:i + batch_size]
+            conn.executemany(_USER_INSERT, batch)
+            conn.commit()
+            done += len(batch)
+            if progress:
+                progress(done, len(rows))
+    invalidate("users")
+    return done
+
+def existing_emails_and_matrics():
+    """Every taken email (lower-cased) and matric number (upper-cased), from one scan of users."""
+    with get_conn() as conn:
+        rows = conn.execute("SELECT LOWER(email), UPPER(matric_no) FROM users").fetchall()
+    return {r[0] for r in rows}, {r[1] for r in rows if r[1]}
+
 def attendance_summary(student_id: int):
 
     """
@@ -207,12 +302,11 @@ def attendance_summary(student_id: int):
     with get_conn() as conn:
         cur = conn.execute("""
             SELECT c.code, c.title,
-                   COUNT(*) AS total_classes,
-                   SUM(a.present) AS attended
-            FROM attendance a
-            JOIN courses c ON c.id = a.course_id
-            WHERE a.student_id=?
-            GROUP BY c.id
+                   r.total AS total_classes,
+                   r.present AS attended
+            FROM attendance_rollup r
+            JOIN courses c ON c.id = r.course_id
+            WHERE r.student_id=? AND r.total > 0
             ORDER BY c.code
         """, (student_id,))
         
@@ -236,8 +330,12 @@ def attendance_summary(student_id: int):
 
 def delete_user_by_email(email: str):
     with get_conn() as conn:
+        row = conn.execute("SELECT id FROM users WHERE email=?", (email,)).fetchone()
         conn.execute("DELETE FROM users WHERE email=?", (email,))
         conn.commit()
+    if row:
+        invalidate_user(row[0])
+    invalidate("users")
 
 def reset_password(email: str, hashed_pwd: bytes):
     with get_conn() as conn:
@@ -284,10 +382,61 @@ def get_attendance(student_id: int):
 
     return results
 
+def course_attendance_pivot(course_id: int, session: str, semester: str) -> AttendanceMatrix:
+    """
+    Students x class-dates matrix for a course, built from one ordered scan
+    of attendance (only students with at least one record appear).
+    """
+    with get_conn() as conn:
+        rows = conn.execute("""
+            SELECT u.id, u.full_name, a.class_date, a.present
+            FROM enrollments e
+            JOIN users u ON u.id = e.student_id
+            JOIN attendance a ON a.course_id = e.course_id AND a.student_id = e.student_id
+            WHERE e.course_id=? AND e.session=? AND e.semester=?
+            ORDER BY u.full_name, u.id
+        """, (course_id, session, semester)).fetchall()
+    return AttendanceMatrix.from_rows(rows)
+
+def course_attendance_matrix(course_id: int, session: str, semester: str):
+    """
+    Attendance for a whole course in two queries:
+      - "pivot": the AttendanceMatrix (students x dates),
+      - "summary": one row per student with an attendance %,
+      - "records": the per-date register (one row per student per class).
+    """
+    pivot = course_attendance_pivot(course_id, session, semester)
+    with get_conn() as conn:
+        records = conn.execute("""
+            SELECT u.full_name AS student, c.code, a.class_date, a.present,
+                   m.full_name AS marked_by
+            FROM enrollments e
+            JOIN users u ON u.id = e.student_id
+            JOIN attendance a ON a.course_id = e.course_id AND a.student_id = e.student_id
+            JOIN courses c ON c.id = a.course_id
+            LEFT JOIN users m ON m.id = a.marked_by
+            WHERE e.course_id=? AND e.session=? AND e.semester=?
+            ORDER BY a.class_date, u.full_name
+        """, (course_id, session, semester)).fetchall()
+
+    return {
+        "pivot": pivot,
+        "summary": pivot.summary_rows(),
+        "records": [{
+            "Student": r["student"],
+            "Course Code": r["code"],
+            "Class Date": r["class_date"],
+            "Status": "Present ✅" if r["present"] == 1 else "Absent ❌",
+            "Marked By": r["marked_by"] or "Unknown",
+        } for r in records],
+    }
+
 def set_user_active(user_id: int, active: int):
     with get_conn() as conn:
         conn.execute("UPDATE users SET is_active=? WHERE id=?", (active, user_id))
         conn.commit()
+    invalidate_user(user_id)
+    invalidate("users")
 
 
 def list_resources_for_course(course_code: str):
@@ -335,6 +484,7 @@ def allocate_course_to_lecturer(lecturer_id: int, course_id: int, session: str,
             VALUES (?, ?, ?, ?)
         """, (lecturer_id, course_id, session, semester))
         conn.commit()
+    invalidate("lecturer_courses")
 
 # ----------------- Admin -----------------
 def add_course(code: str, title: str, units: int, level: str, semester = "First", session="2024/2025"):
@@ -347,6 +497,7 @@ def add_course(code: str, title: str, units: int, level: str, semester = "First"
             VALUES (?, ?, ?, ?, ?, ?)
         """, (code, title, units, level,semester, session))
         conn.commit()
+    invalidate("courses")
 
 
 def save_resource(course_id: int, user_id: int,title, description: str, file):
@@ -378,6 +529,7 @@ def delete_resource(resource_id: int):
 
 
 
+@cached("courses")
 def list_all_courses(session="2024/2025", semester="First"):
     with get_conn() as conn:
         rows = conn.execute("""
@@ -405,6 +557,7 @@ def drop_course_allocation(lecturer_id: int, course_id: int):
             WHERE lecturer_id=? AND course_id=?
         """, (lecturer_id, course_id))
         conn.commit()
+    invalidate("lecturer_courses")
 
 def add_notification(title: str, message: str, user_id: int = None, course_id: int = None):
     """Insert a notification for a user, course, or system-wide."""
@@ -415,23 +568,112 @@ def add_notification(title: str, message: str, user_id: int = None, course_id: i
         """, (title, message, user_id, course_id))
         conn.commit()
 
-def get_notifications_for_user(user_id: int):
-    """Get notifications for a specific student (system + personal + course updates)."""
+NOTIFICATION_KINDS = ("System", "Course", "Personal")
+
+# One branch per audience, each read newest-first from its own index range
+# and cut at :limit. Course notifications are taken per course (at most :limit
+# each) so a page never walks a course's whole history.
+_FEED_BRANCHES = {
+    "System": """
+        SELECT n.id, n.title, n.message, n.created_at, n.user_id, n.course_id, n.event_count, 'System' AS kind
+        FROM notifications n
+        WHERE n.user_id IS NULL AND n.course_id IS NULL AND n.id < :before{unread_n}
+        ORDER BY n.id DESC LIMIT :limit""",
+    "Course": """
+        SELECT n.id, n.title, n.message, n.created_at, n.user_id, n.course_id, n.event_count, 'Course' AS kind
+        FROM (SELECT course_id FROM enrollments WHERE student_id = :uid
+              UNION SELECT course_id FROM lecturer_courses WHERE lecturer_id = :uid) m
+        JOIN notifications n ON n.id IN (
+            SELECT x.id FROM notifications x
+            WHERE x.course_id = m.course_id AND x.user_id IS NULL AND x.id < :before{unread_x}
+            ORDER BY x.id DESC LIMIT :limit)
+        ORDER BY n.id DESC LIMIT :limit""",
+    "Personal": """
+        SELECT n.id, n.title, n.message, n.created_at, n.user_id, n.course_id, n.event_count, 'Personal' AS kind
+        FROM notifications n
+        WHERE n.user_id = :uid AND n.id < :before{unread_n}
+        ORDER BY n.id DESC LIMIT :limit""",
+}
+
+_UNREAD_FILTER = """ AND {a}.id > :last_read AND NOT EXISTS (
+            SELECT 1 FROM notification_reads r WHERE r.user_id = :uid AND r.notification_id = {a}.id)"""
+
+
+def get_notification_feed(user_id: int, before_id: int = None, limit: int = 20, kind: str = "All",
+                          unread_only: bool = False):
+    """
+    One page of a user's notifications, newest first: system-wide ones, those
+    for courses they are enrolled in or teach, and personal ones.
+    Pass the last id of a page as before_id to get the next; kind narrows to
+    "System", "Course" or "Personal". Each row has is_read.
+    """
+    kinds = NOTIFICATION_KINDS if kind in (None, "All") else (kind,)
+    unread = {"unread_n": _UNREAD_FILTER.format(a="n"), "unread_x": _UNREAD_FILTER.format(a="x")} \
+        if unread_only else {"unread_n": "", "unread_x": ""}
+    branches = " UNION ALL ".join(f"SELECT * FROM ({_FEED_BRANCHES[k].format(**unread)})" for k in kinds)
     with get_conn() as conn:
-        cur = conn.execute("""
-            SELECT n.id, n.title, n.message, n.created_at, c.code AS course_code
-            FROM notifications n
-            LEFT JOIN courses c ON c.id = n.course_id
-            WHERE n.user_id IS NULL OR n.user_id=? 
-               OR n.course_id IN (
-                   SELECT course_id FROM enrollments WHERE student_id=?
-               )
-            ORDER BY n.created_at DESC
-        """, (user_id, user_id))
+        last_read = _last_read_id(conn, user_id)
+        cur = conn.execute(f"""
+            SELECT f.id, f.title, f.message, f.created_at, f.user_id, f.kind, f.event_count, c.code AS course_code,
+                   (f.id <= :last_read OR EXISTS (
+                        SELECT 1 FROM notification_reads r
+                        WHERE r.user_id = :uid AND r.notification_id = f.id)) AS is_read
+            FROM ({branches}) f
+            LEFT JOIN courses c ON c.id = f.course_id
+            ORDER BY f.id DESC
+            LIMIT :limit
+        """, {"uid": user_id, "before": before_id or (1 << 62), "limit": limit, "last_read": last_read})
         rows = cur.fetchall()
         cols = [d[0] for d in cur.description]
     return [dict(zip(cols, r)) for r in rows]
 
+def _last_read_id(conn, user_id: int) -> int:
+    row = conn.execute("SELECT last_read_id FROM notification_state WHERE user_id=?", (user_id,)).fetchone()
+    return row[0] if row else 0
+
+
+def unread_notification_count(user_id: int) -> int:
+    """Badge count: one primary-key lookup on the trigger-maintained counter."""
+    with get_conn() as conn:
+        row = conn.execute("SELECT unread_count FROM notification_state WHERE user_id=?", (user_id,)).fetchone()
+    return row[0] if row else 0
+
+
+def mark_notification_read(user_id: int, notification_id: int):
+    """Mark one notification read (a no-op if it already is)."""
+    with get_conn() as conn:
+        if notification_id > _last_read_id(conn, user_id):
+            conn.execute("""
+                INSERT OR IGNORE INTO notification_reads (user_id, notification_id)
+                VALUES (?, ?)
+            """, (user_id, notification_id))
+
+
+def mark_all_notifications_read(user_id: int):
+    """Move the user's high-water mark to the newest notification and zero the counter."""
+    with get_conn() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("""
+            INSERT INTO notification_state (user_id, last_read_id, unread_count)
+            VALUES (?, (SELECT COALESCE(MAX(id), 0) FROM notifications), 0)
+            ON CONFLICT(user_id) DO UPDATE SET last_read_id = excluded.last_read_id, unread_count = 0
+        """, (user_id,))
+        # individual marks at or below the new mark are redundant now
+        conn.execute("DELETE FROM notification_reads WHERE user_id=?", (user_id,))
+        conn.commit()
+
+
+def rebuild_unread_counts(user_id: int = None):
+    """Recompute unread_count for one user, or everyone (repairs / after bulk deletes)."""
+    with get_conn() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("INSERT OR IGNORE INTO notification_state (user_id) SELECT id FROM users")
+        if user_id is None:
+            conn.execute(UNREAD_RECOUNT.format(user="notification_state.user_id"))
+        else:
+            conn.execute(UNREAD_RECOUNT.format(user="?"), (user_id,))
+        conn.commit()
+
 def get_all_notifications(limit: int = 200):
     """
     Admin/overview helper: return all notifications (newest first).
@@ -442,7 +684,7 @@ def get_all_notifications(limit: int = 200):
             FROM notifications n
             LEFT JOIN courses c ON c.id = n.course_id
             LEFT JOIN users u ON u.id = n.user_id
-            ORDER BY n.created_at DESC
+            ORDER BY n.id DESC
             LIMIT ?
         """, (limit,))
         rows = cur.fetchall()
@@ -453,7 +695,7 @@ def get_all_notifications(limit: int = 200):
 def list_all_users():
     """Return minimal user info for admin selectboxes."""
     with get_conn() as conn:
-        cur = conn.execute("SELECT id, full_name, email, role FROM users ORDER BY full_name")
+        cur = conn.execute("SELECT id, full_name, email, role, matric_no FROM users ORDER BY full_name")
         rows = cur.fetchall()
         cols = [d[0] for d in cur.description]
     return [dict(zip(cols, r)) for r in rows]
@@ -497,20 +739,10 @@ def list_courses_for_lecturer(lecturer_id: int, session: str = None, semester: s
 
 def get_recent_notifications(user_id: int, limit: int = 3):
     """
-    Fetches the most recent notifications for a student.
-    Includes system-wide (NULL user_id) and personal ones.
+    Fetches the most recent notifications for a user (dashboard preview):
+    the first page of get_notification_feed.
     """
-    with get_conn() as conn:
-        cur = conn.execute("""
-            SELECT id, title, message, created_at
-            FROM notifications
-            WHERE user_id IS NULL OR user_id=?
-            ORDER BY created_at DESC
-            LIMIT ?
-        """, (user_id, limit))
-        rows = cur.fetchall()
-        cols = [d[0] for d in cur.description]
-    return [dict(zip(cols, r)) for r in rows]
+    return get_notification_feed(user_id, limit=limit)
 
 
 def drop_lecturer_course(lecturer_id, course_code, session, semester):
@@ -526,7 +758,8 @@ def drop_lecturer_course(lecturer_id, course_code, session, semester):
             return False
         conn.execute("DELETE FROM lecturer_courses WHERE id=?", (row["id"],))
         conn.commit()
-        return True
+    invalidate("lecturer_courses")
+    return True
     
 def get_course_ids(id, session, semester):
     with get_conn() as conn:
@@ -546,6 +779,7 @@ def count_users_by_role(role: str):
         cur = conn.execute("SELECT COUNT(*) FROM users WHERE role=?", (role,))
         return cur.fetchone()[0]
 
+@cached("courses")
 def count_courses():
     with get_conn() as conn:
         cur = conn.execute("SELECT COUNT(*) FROM courses")
@@ -564,22 +798,101 @@ def get_avg_gpa():
 
 def get_avg_attendance():
     with get_conn() as conn:
-        cur = conn.execute("SELECT AVG(present*100.0/total) FROM ( \
-            SELECT student_id, course_id, COUNT(*) as total, SUM(present) as present \
-            FROM attendance GROUP BY student_id, course_id )")
+        # one row per student/course instead of every attendance row ever recorded
+        cur = conn.execute("SELECT AVG(present*100.0/total) FROM attendance_rollup WHERE total > 0")
         row = cur.fetchone()
         return row[0] if row and row[0] else 0.0
 
-def get_system_alerts():
+def rebuild_attendance_rollup():
+    """Recompute attendance_rollup from the raw attendance rows (backfills / repairs)."""
+    with get_conn() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM attendance_rollup")
+        conn.execute("""
+            INSERT INTO attendance_rollup (student_id, course_id, total, present)
+            SELECT student_id, course_id, COUNT(*), SUM(present)
+            FROM attendance
+            GROUP BY student_id, course_id
+        """)
+        conn.commit()
+        return conn.execute("SELECT COUNT(*) FROM attendance_rollup").fetchone()[0]
+
+def get_system_alerts(avg_attendance: float = None, avg_gpa: float = None):
+    """Pass the averages if the caller already has them to skip re-querying."""
     alerts = []
+    if avg_attendance is None:
+        avg_attendance = get_avg_attendance()
+    if avg_gpa is None:
+        avg_gpa = get_avg_gpa()
     # Example rules
-    if get_avg_attendance() < 50:
+    if avg_attendance < 50:
         alerts.append("Low overall attendance detected.")
-    if get_avg_gpa() < 2.0:
+    if avg_gpa < 2.0:
         alerts.append("Average GPA is below 2.0.")
+    # at-risk students from the last utils.risk scan
+    for r in risk_flag_counts():
+        alerts.append(f"{r['students']} student(s) flagged ({r['severity']}) for {RISK_LABELS[r['kind']]} "
+                      f"in {r['session']} {r['semester']}.")
     return alerts
 
 
+# ----------------- At-risk flags (written by utils/risk.py) -----------------
+RISK_LABELS = {"attendance": "low attendance", "ca": "failing CA", "gpa_drop": "projected GPA drop"}
+
+
+def risk_flag_counts(session: str = None, semester: str = None):
+    """Distinct flagged students per term / kind / severity."""
+    where, params = "", ()
+    if session and semester:
+        where, params = "WHERE session=? AND semester=?", (session, semester)
+    with get_conn() as conn:
+        return conn.execute(f"""
+            SELECT session, semester, kind, severity, COUNT(DISTINCT student_id) AS students
+            FROM risk_flags {where}
+            GROUP BY session, semester, kind, severity
+            ORDER BY session, semester, kind, severity
+        """, params).fetchall()
+
+
+def risk_flags_for_lecturer(lecturer_id: int, session: str, semester: str):
+    """
+    Flags on the courses a lecturer teaches in a term, plus term-level flags
+    (GPA drop, course_id NULL) of the students enrolled in those courses.
+    """
+    with get_conn() as conn:
+        return conn.execute("""
+            SELECT c.code, u.full_name, u.matric_no, f.kind, f.severity, f.value, f.threshold, f.created_at
+            FROM lecturer_courses lc
+            JOIN risk_flags f ON f.course_id = lc.course_id
+                 AND f.session = lc.session AND f.semester = lc.semester
+            JOIN courses c ON c.id = f.course_id
+            JOIN users u ON u.id = f.student_id
+            WHERE lc.lecturer_id=? AND lc.session=? AND lc.semester=?
+            UNION ALL
+            SELECT c.code, u.full_name, u.matric_no, f.kind, f.severity, f.value, f.threshold, f.created_at
+            FROM lecturer_courses lc
+            JOIN enrollments e ON e.course_id = lc.course_id
+                 AND e.session = lc.session AND e.semester = lc.semester
+            JOIN risk_flags f ON f.student_id = e.student_id AND f.course_id IS NULL
+                 AND f.session = lc.session AND f.semester = lc.semester
+            JOIN courses c ON c.id = lc.course_id
+            JOIN users u ON u.id = f.student_id
+            WHERE lc.lecturer_id=? AND lc.session=? AND lc.semester=?
+            ORDER BY 1, 5, 2
+        """, (lecturer_id, session, semester) * 2).fetchall()
+
+
+def risk_flags_for_student(student_id: int, session: str, semester: str):
+    with get_conn() as conn:
+        return conn.execute("""
+            SELECT c.code, f.kind, f.severity, f.value, f.threshold
+            FROM risk_flags f
+            LEFT JOIN courses c ON c.id = f.course_id
+            WHERE f.student_id=? AND f.session=? AND f.semester=?
+            ORDER BY f.severity, f.kind
+        """, (student_id, session, semester)).fetchall()
+
+
 def get_user_by_email(email: str):
     with get_conn() as conn:
         cur = conn.execute("SELECT * FROM users WHERE email=?", (email,))
@@ -635,10 +948,54 @@ def calculate_gpa(student_id, session, semester):
         return gpa
 
 
+def compute_term_gpas(session: str, semester: str, level: str = None):
+    """
+    Batch GPA run for every student enrolled in a session/semester (optionally
+    one level): one grouped scan of scores x enrollments x courses, grading and
+    unit weighting in NumPy (utils.gpa rules), then a single bulk upsert into
+    student_gpa. Returns the number of students written.
+    """
+    params = [session, semester]
+    level_filter = ""
+    if level:
+        level_filter = "AND e.student_id IN (SELECT id FROM users WHERE role='student' AND level=?)"
+        params.append(level)
+
+    with get_conn() as conn:
+        rows = conn.execute(f"""
+            SELECT e.student_id, c.units,
+                   AVG(CASE WHEN s.component = 'exam' THEN s.score END) AS exam_avg,
+                   AVG(CASE WHEN s.component <> 'exam' THEN s.score END) AS ca_avg
+            FROM enrollments e
+            JOIN courses c ON c.id = e.course_id
+            JOIN scores s ON s.student_id = e.student_id AND s.course_id = e.course_id
+            WHERE e.session=? AND e.semester=? {level_filter}
+            GROUP BY e.student_id, e.course_id
+        """, params).fetchall()
+        if not rows:
+            return 0
+
+        cols = list(zip(*rows))
+        student_ids, gpas = gpas_by_group(
+            cols[0],
+            cols[1],
+            [float("nan") if v is None else v for v in cols[2]],
+            [float("nan") if v is None else v for v in cols[3]],
+        )
+        conn.executemany("""
+            INSERT INTO student_gpa (student_id, session, semester, gpa)
+            VALUES (?,?,?,?)
+            ON CONFLICT(student_id, session, semester)
+            DO UPDATE SET gpa=excluded.gpa, created_at=CURRENT_TIMESTAMP
+        """, [(int(sid), session, semester, float(g)) for sid, g in zip(student_ids, gpas)])
+        return len(student_ids)
+
+
 def update_is_active(user_id, value):
     with get_conn() as conn:
         conn.execute("UPDATE users SET is_active = ? WHERE id = ?", (value, user_id))
         conn.commit()
+    invalidate("users")  # get_all_lecturers shows the active flag
 
 
 
@@ -663,6 +1020,7 @@ def delete_course(course_id: int):
         conn.execute("DELETE FROM notifications WHERE course_id=?", (course_id,))
         conn.execute("DELETE FROM courses WHERE id=?", (course_id,))
         conn.commit()
+    invalidate("courses", "lecturer_courses")
 
 def list_course_students(course_id: int, session: str, semester: str):
     """List students enrolled in a specific course."""
@@ -691,6 +1049,7 @@ def list_course_students(course_id: int, session: str, semester: str):
 
     return results
 
+@cached("lecturer_courses", "users")
 def list_course_lecturers(course_id: int, session: str = "2024/2025", semester: str = "First"):
     """List lecturers teaching a course (with optional session & semester)."""
     with get_conn() as conn:
@@ -738,6 +1097,7 @@ def list_all_resources():
 
 import sqlite3
 
+@cached("users")
 def get_all_lecturers():
     role = "lecturer"
     with get_conn() as conn:
@@ -768,6 +1128,7 @@ def get_all_lecturers():
     return results
 
 
+@cached("courses")
 def get_course_id_by_code(code: str):
     with get_conn() as conn:
         cur = conn.execute("SELECT id FROM courses WHERE code = ?", (code,))
@@ -790,6 +1151,8 @@ def update_user_info(user_id, full_name=None, email=None, level=None):
         #     SET full_name = ?, email = ?
         #     WHERE id = ?
         # """, (full_name, email, user_id))
+    invalidate_user(user_id)
+    invalidate("users")
 
 
 def change_password(user_id, old_password, new_password):
@@ -800,12 +1163,14 @@ def change_password(user_id, old_password, new_password):
             return False, "User not found."
 
         stored_hash = row["password_hash"]
-        if not bcrypt.checkpw(old_password.encode(), stored_hash):
-            return False, "Old password is incorrect."
+    # hashing happens outside the connection so it isn't held for ~2 bcrypt rounds
+    if not verify_password(old_password, stored_hash):
+        return False, "Old password is incorrect."
 
-        new_hash = bcrypt.hashpw(new_password.encode(), bcrypt.gensalt())
+    new_hash = hash_password(new_password)
+    with get_conn() as conn:
         conn.execute("UPDATE users SET password_hash=? WHERE id=?", (new_hash, user_id))
-        return True, "Password updated successfully."
+    return True, "Password updated successfully."
 
 
 def update_profile_pic(user_id, file_path):
@@ -815,6 +1180,7 @@ def update_profile_pic(user_id, file_path):
             SET profile_pic = ?
             WHERE id = ?
         """, (file_path, user_id))
+    invalidate_user(user_id)
 
 
 def get_user_profile(user_id: int):
@@ -832,6 +1198,122 @@ def get_user_profile(user_id: int):
     # Convert sqlite3.Row → dict
     return dict(row)
 
+# ----------------- Group Messaging -----------------
+# Threads are read by id on messages(course_id, id): the page keeps a buffer
+# and asks only for what is newer than its last id, or one page older than its first.
+_MESSAGE_COLUMNS = "m.id, m.sender_id, m.body, m.created_at, u.full_name"
+
+
+def send_message(sender_id: int, course_id: int, body: str) -> int:
+    with get_conn() as conn:
+        cur = conn.execute(
+            "INSERT INTO messages (sender_id, course_id, body) VALUES (?,?,?)",
+            (sender_id, course_id, body),
+        )
+        return cur.lastrowid
+
+
+def get_messages_after(course_id: int, after_id: int = 0, limit: int = 200):
+    """Messages newer than after_id, oldest first (the poll for new messages)."""
+    with get_conn() as conn:
+        cur = conn.execute(f"""
+            SELECT {_MESSAGE_COLUMNS}
+            FROM messages m
+            JOIN users u ON u.id = m.sender_id
+            WHERE m.course_id=? AND m.id > ?
+            ORDER BY m.id
+            LIMIT ?
+        """, (course_id, after_id, limit))
+        rows = cur.fetchall()
+        cols = [d[0] for d in cur.description]
+    return [dict(zip(cols, r)) for r in rows]
+
+
+def get_messages_before(course_id: int, before_id: int = None, limit: int = 50):
+    """The limit messages just older than before_id (latest if None), oldest first."""
+    with get_conn() as conn:
+        cur = conn.execute(f"""
+            SELECT * FROM (
+                SELECT {_MESSAGE_COLUMNS}
+                FROM messages m
+                JOIN users u ON u.id = m.sender_id
+                WHERE m.course_id=? AND m.id < ?
+                ORDER BY m.id DESC
+                LIMIT ?
+            ) ORDER BY id
+        """, (course_id, before_id or (1 << 62), limit))
+        rows = cur.fetchall()
+        cols = [d[0] for d in cur.description]
+    return [dict(zip(cols, r)) for r in rows]
+
+
+# ----------------- Search -----------------
+SEARCH_SOURCES = ("Message", "Notification", "Resource")
+
+# One FTS5 branch per source; the visibility filters mirror the feed: your
+# courses (enrolled or taught; every course for admins), plus system-wide and
+# personal notifications. Titles weigh more than bodies in bm25.
+_SEARCH_BRANCHES = {
+    "Message": """
+        SELECT 'Message' AS source, m.id, m.course_id, u.full_name AS title,
+               snippet(messages_fts, 0, '**', '**', '…', 16) AS snippet,
+               m.created_at, bm25(messages_fts) AS rank
+        FROM messages_fts
+        JOIN messages m ON m.id = messages_fts.rowid
+        JOIN users u ON u.id = m.sender_id
+        WHERE messages_fts MATCH :q AND (:admin OR m.course_id IN (SELECT course_id FROM my_courses))""",
+    "Notification": """
+        SELECT 'Notification' AS source, n.id, n.course_id, n.title,
+               snippet(notifications_fts, 1, '**', '**', '…', 16) AS snippet,
+               n.created_at, bm25(notifications_fts, 4.0, 1.0) AS rank
+        FROM notifications_fts
+        JOIN notifications n ON n.id = notifications_fts.rowid
+        WHERE notifications_fts MATCH :q AND (:admin OR n.user_id = :uid OR (n.user_id IS NULL AND (
+              n.course_id IS NULL OR n.course_id IN (SELECT course_id FROM my_courses))))""",
+    "Resource": """
+        SELECT 'Resource' AS source, r.id, r.course_id, r.title,
+               snippet(resources_fts, 1, '**', '**', '…', 16) AS snippet,
+               r.created_at, bm25(resources_fts, 4.0, 1.0) AS rank
+        FROM resources_fts
+        JOIN resources r ON r.id = resources_fts.rowid
+        WHERE resources_fts MATCH :q AND (:admin OR r.course_id IN (SELECT course_id FROM my_courses))""",
+}
+
+
+def _fts_query(text: str) -> str:
+    """Turn free text into a safe FTS5 query: every word must match (as a prefix from 3 letters)."""
+    words = text.replace('"', " ").split()
+    return " ".join(f'"{w}"*' if len(w) >= 3 else f'"{w}"' for w in words)
+
+
+def search(user_id: int, role: str, text: str, sources=None, limit: int = 20, offset: int = 0):
+    """
+    Ranked full-text search over the messages, notifications and resources
+    the user can see. Returns (results, has_more); results carry source, id,
+    course_code, title, snippet (matches in **bold**) and created_at.
+    """
+    q = _fts_query(text)
+    if not q:
+        return [], False
+    branches = " UNION ALL ".join(_SEARCH_BRANCHES[s] for s in (sources or SEARCH_SOURCES))
+    with get_conn() as conn:
+        cur = conn.execute(f"""
+            WITH my_courses(course_id) AS (
+                SELECT course_id FROM enrollments WHERE student_id = :uid
+                UNION SELECT course_id FROM lecturer_courses WHERE lecturer_id = :uid
+            )
+            SELECT h.source, h.id, c.code AS course_code, h.title, h.snippet, h.created_at
+            FROM ({branches}) h
+            LEFT JOIN courses c ON c.id = h.course_id
+            ORDER BY h.rank, h.id DESC
+            LIMIT :limit OFFSET :offset
+        """, {"q": q, "uid": user_id, "admin": role == "admin", "limit": limit + 1, "offset": offset})
+        rows = cur.fetchall()
+        cols = [d[0] for d in cur.description]
+    results = [dict(zip(cols, r)) for r in rows]
+    return results[:limit], len(results) > limit
+
+
 # =================== Help and Support ======================
 def save_support_ticket(name, email, message):
     with get_conn() as conn:
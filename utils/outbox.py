@@ -0,0 +1,248 @@
+"""
+Notification outbox for high-frequency writers (score and attendance saves).
+
+    from utils.outbox import notify
+    notify(f"Attendance marked for {code}", f"Attendance for {day} has been recorded.", course_id=cid)
+
+notify() only queues the event. A background writer flushes the queue every
+FLUSH_INTERVAL seconds in one transaction. Events with the same (course,
+user, title) are coalesced: within the queue they become one event, and
+within COALESCE_WINDOW seconds of the row they first produced they bump that
+row's event_count (and replace its message) instead of inserting a new one.
+A row only absorbs repeats while nobody in its audience (the user, the
+course's students and lecturers, or everyone) has read it: once someone has,
+the next event gets a new row, so it shows up unread (and on the badge) again.
+A grading session therefore leaves one notification per course and title,
+not one per save.
+
+The open-row map is per process, so a restart starts a new row; flush() is
+also registered with atexit so queued events aren't lost on shutdown.
+
+    python -m utils.outbox --check   # coalescing vs. read state, on a copy of the DB
+"""
+import atexit
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from . import db
+from .db import get_conn
+
+log = logging.getLogger(__name__)
+
+COALESCE_WINDOW = float(os.environ.get("EDUSHIELD_NOTIFY_COALESCE_SECS", 600))
+FLUSH_INTERVAL = float(os.environ.get("EDUSHIELD_NOTIFY_FLUSH_SECS", 2))
+
+STATS = {"queued": 0, "inserted": 0, "coalesced": 0, "flushes": 0, "errors": 0, "last_error": None}
+_pending = {}    # (course_id, user_id, title) -> [message, count]
+_open = {}       # (course_id, user_id, title) -> (notification id, opened at)
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_writer = None
+
+
+def notify(title: str, message: str, course_id: int = None, user_id: int = None):
+    """Queue a notification; identical (course, user, title) events are merged."""
+    global _writer
+    key = (course_id, user_id, title)
+    with _lock:
+        event = _pending.get(key)
+        if event is None:
+            _pending[key] = [message, 1]
+        else:
+            event[0] = message
+            event[1] += 1
+        STATS["queued"] += 1
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_run, daemon=True, name="notification-outbox")
+            _writer.start()
+
+
+def flush() -> int:
+    """Write everything queued so far; returns the number of events written."""
+    with _flush_lock:
+        with _lock:
+            batch = list(_pending.items())
+            _pending.clear()
+        if not batch:
+            return 0
+
+        now = time.monotonic()
+        for key, opened in list(_open.items()):
+            if now - opened[1] > COALESCE_WINDOW:
+                del _open[key]
+
+        opened = {}
+        try:
+            with get_conn() as conn:
+                conn.execute("BEGIN IMMEDIATE")  # no one can mark a row read between the check and the bump
+                bumps = []
+                for key, (message, count) in batch:
+                    row_id = _open[key][0] if key in _open else None
+                    if row_id is not None and _unread_by_all(conn, row_id, key):
+                        bumps.append((count, message, row_id))
+                        continue
+                    course_id, user_id, title = key
+                    cur = conn.execute("""
+                        INSERT INTO notifications (title, message, user_id, course_id, event_count)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, (title, message, user_id, course_id, count))
+                    opened[key] = (cur.lastrowid, now)
+                conn.executemany("""
+                    UPDATE notifications SET event_count = event_count + ?, message = ?
+                    WHERE id = ?
+                """, bumps)
+                conn.commit()
+        except Exception:
+            # put the batch back (merged with anything queued meanwhile) for the next flush
+            with _lock:
+                for key, (message, count) in batch:
+                    event = _pending.setdefault(key, [message, 0])
+                    event[1] += count
+            raise
+        _open.update(opened)
+
+        events = sum(count for _, (_, count) in batch)
+        with _lock:
+            STATS["inserted"] += len(batch) - len(bumps)
+            STATS["coalesced"] += events - (len(batch) - len(bumps))
+            STATS["flushes"] += 1
+        return events
+
+
+def _unread_by_all(conn, row_id, key):
+    """
+    True if the row still exists and no one in its audience has read it,
+    individually or via mark-all-read (last_read_id at or past it). Users
+    outside the audience don't count, so their mark-all-read doesn't stop it.
+    """
+    if conn.execute("""
+        SELECT 1 FROM notifications n
+        WHERE n.id = ? AND NOT EXISTS (SELECT 1 FROM notification_reads r WHERE r.notification_id = n.id)
+    """, (row_id,)).fetchone() is None:
+        return False
+    course_id, user_id, _ = key
+    if user_id is not None:
+        readers = conn.execute(
+            "SELECT 1 FROM notification_state WHERE user_id = ? AND last_read_id >= ?", (user_id, row_id))
+    elif course_id is None:
+        readers = conn.execute("SELECT 1 FROM notification_state WHERE last_read_id >= ? LIMIT 1", (row_id,))
+    else:
+        readers = conn.execute("""
+            SELECT 1 FROM notification_state
+            WHERE last_read_id >= ? AND user_id IN (
+                SELECT student_id FROM enrollments WHERE course_id = ?
+                UNION SELECT lecturer_id FROM lecturer_courses WHERE course_id = ?)
+            LIMIT 1
+        """, (row_id, course_id, course_id))
+    return readers.fetchone() is None
+
+
+def _run():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush()
+        except Exception as e:  # keep the writer alive; the batch is retried next time
+            log.exception("notification outbox flush failed")
+            with _lock:
+                STATS["errors"] += 1
+                STATS["last_error"] = f"{time.strftime('%Y-%m-%d %H:%M:%S')}: {e}"
+
+
+def outbox_stats() -> dict:
+    with _lock:
+        return dict(STATS, pending=sum(c for _, c in _pending.values()), open_rows=len(_open))
+
+
+def check_coalescing(source_path: str = None):
+    """
+    On a throw-away copy of the database: a repeat event must fold into an
+    unread row, but after the reader has marked it read it must arrive as a
+    new unread notification. Returns a list of problems (empty = OK).
+    """
+    from . import models
+    from .migrations import migrate
+
+    source_path = source_path or db.DB_PATH
+    old_path = db.DB_PATH
+    fd, tmp_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    saved_open = dict(_open)
+    problems = []
+    try:
+        src = sqlite3.connect(source_path)
+        dst = sqlite3.connect(tmp_path)
+        src.backup(dst)
+        src.close()
+        dst.close()
+
+        db.configure(path=tmp_path)
+        migrate(force=True)
+        _open.clear()
+        with get_conn() as conn:
+            row = conn.execute("SELECT student_id, course_id FROM enrollments LIMIT 1").fetchone()
+        if row is None:
+            return ["no enrollments to test with"]
+        student_id, course_id = row
+        title = "Outbox check: scores posted"
+
+        def badge():
+            return models.unread_notification_count(student_id)
+
+        notify(title, "Scores for Test", course_id=course_id)
+        flush()
+        models.mark_all_notifications_read(student_id)
+        notify(title, "Scores for Exam", course_id=course_id)
+        flush()
+        feed = models.get_notification_feed(student_id, limit=1, unread_only=True)
+        if badge() != 1:
+            problems.append(f"badge is {badge()} after a repeat of a read notification, expected 1")
+        if not feed or feed[0]["message"] != "Scores for Exam":
+            problems.append("repeat of a read notification is missing from the unread feed")
+
+        notify(title, "Scores for Assignment", course_id=course_id)
+        flush()
+        feed = models.get_notification_feed(student_id, limit=1, unread_only=True)
+        if badge() != 1 or not feed or feed[0]["event_count"] != 2:
+            problems.append("repeat of an unread notification was not folded into it")
+
+        # someone outside the course marking all read must not stop the folding
+        with get_conn() as conn:
+            outsider = conn.execute("""
+                SELECT id FROM users WHERE id NOT IN (
+                    SELECT student_id FROM enrollments WHERE course_id = ?
+                    UNION SELECT lecturer_id FROM lecturer_courses WHERE course_id = ?)
+                LIMIT 1
+            """, (course_id, course_id)).fetchone()
+        if outsider is not None:
+            models.mark_all_notifications_read(outsider[0])
+            notify(title, "Scores for Test (re-graded)", course_id=course_id)
+            flush()
+            feed = models.get_notification_feed(student_id, limit=1, unread_only=True)
+            if badge() != 1 or not feed or feed[0]["event_count"] != 3:
+                problems.append("another course's reader marking all read stopped the folding")
+    finally:
+        _open.clear()
+        _open.update(saved_open)
+        db.configure(path=old_path)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(tmp_path + suffix):
+                os.remove(tmp_path + suffix)
+    return problems
+
+
+atexit.register(flush)
+
+
+if __name__ == "__main__" and "--check" in sys.argv:
+    problems = check_coalescing()
+    for p in problems:
+        print("FAIL:", p)
+    if problems:
+        sys.exit(1)
+    print("OK: repeats fold into unread rows and re-notify after a read.")
@@ -0,0 +1,243 @@
+"""
+Query timing for every connection handed out by utils/db.py.
+
+Connections are opened with ProfiledConnection, whose cursors time each
+statement (execute + fetch) and count the rows returned. Time is recorded
+per SQL statement and per calling function (the nearest frame outside
+utils/db.py and this module, e.g. "models.get_scores" or "Attendance.main").
+Statements slower than SLOW_QUERY_MS go to a ring buffer (their EXPLAIN
+QUERY PLAN is looked up only when System Logs shows them), and main.py
+wraps each page run in page_render() so the per-render query counts
+expose N+1 patterns.
+admin/System_Logs.py shows all of it.
+
+Profiling is off unless EDUSHIELD_QUERY_PROFILING=1.
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+PROFILING = os.environ.get("EDUSHIELD_QUERY_PROFILING", "0") == "1"
+SLOW_QUERY_MS = float(os.environ.get("EDUSHIELD_SLOW_QUERY_MS", 100))
+SLOW_LOG_SIZE = 200
+RENDER_LOG_SIZE = 50
+MAX_STATEMENTS = 1000   # distinct SQL texts tracked; later ones are folded into "(other)"
+
+FUNCTION_STATS = {}     # "module.function" -> {"calls", "ms", "rows", "max_ms"}
+STATEMENT_STATS = {}    # sql -> {"calls", "ms", "rows", "max_ms", "function"}
+SLOW_QUERIES = deque(maxlen=SLOW_LOG_SIZE)
+RENDERS = deque(maxlen=RENDER_LOG_SIZE)
+
+_lock = threading.RLock()  # re-entrant: a cursor may be finalised while the lock is held
+_local = threading.local()
+_SKIP_FILES = {os.path.abspath(__file__), os.path.abspath(os.path.join(os.path.dirname(__file__), "db.py"))}
+
+
+def _caller():
+    """'module.function' of the nearest frame outside the DB layer."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (os.path.abspath(filename) not in _SKIP_FILES
+                and "contextlib" not in filename and "pandas" not in filename):
+            module = os.path.splitext(os.path.basename(filename))[0]
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "(unknown)"
+
+
+def _bump(table, key, ms, rows, calls, **extra):
+    s = table.get(key)
+    if s is None:
+        s = table[key] = {"calls": 0, "ms": 0.0, "rows": 0, "max_ms": 0.0, **extra}
+    s["calls"] += calls
+    s["ms"] += ms
+    s["rows"] += rows
+    s["max_ms"] = max(s["max_ms"], ms)
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """
+    Cursor that reports execute/fetch time and row counts to the profiler.
+
+    Time and rows are summed on the cursor itself and recorded to the shared
+    stats once per statement: when it is exhausted, re-executed or closed.
+    """
+
+    _sql, _params, _function = "", (), "(unknown)"
+    _total_ms, _rows, _open = 0.0, 0, False
+
+    def _begin(self, sql, params):
+        self._finish()
+        self._sql, self._params = " ".join(sql.split()), params
+        self._function = _caller()
+        self._total_ms, self._rows, self._open = 0.0, 0, True
+        render = getattr(_local, "render", None)
+        if render is not None:
+            render["queries"] += 1
+            render["functions"][self._function] += 1
+
+    def _finish(self):
+        if not self._open:
+            return
+        self._open = False
+        ms, rows = self._total_ms, self._rows
+        sql = self._sql if (self._sql in STATEMENT_STATS or len(STATEMENT_STATS) < MAX_STATEMENTS) else "(other)"
+        with _lock:
+            _bump(FUNCTION_STATS, self._function, ms, rows, 1)
+            _bump(STATEMENT_STATS, sql, ms, rows, 1, function=self._function)
+        render = getattr(_local, "render", None)
+        if render is not None:
+            render["ms"] += ms
+        if ms >= SLOW_QUERY_MS:
+            # the plan is looked up later by query_plan(), not on the request path
+            SLOW_QUERIES.append({
+                "at": time.strftime("%Y-%m-%d %H:%M:%S"), "function": self._function, "sql": self._sql,
+                "params": self._params, "ms": round(ms, 1), "rows": rows, "plan": None,
+            })
+
+    def execute(self, sql, params=()):
+        self._begin(sql, params)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self._total_ms += (time.perf_counter() - start) * 1000
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        self._begin(sql, seq_of_params[0] if seq_of_params else ())
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_params)
+        finally:
+            self._total_ms += (time.perf_counter() - start) * 1000
+            self._finish()
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._total_ms += (time.perf_counter() - start) * 1000
+        if row is None:
+            self._finish()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._total_ms += (time.perf_counter() - start) * 1000
+        self._rows += len(rows)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._total_ms += (time.perf_counter() - start) * 1000
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """sqlite3.Connection whose cursors (including conn.execute shortcuts) are ProfiledCursors."""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        if sql.lstrip()[:6].upper() == "PRAGMA":  # connection setup, not app queries
+            return super().execute(sql, params)
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+
+def query_plan(entry: dict) -> str:
+    """EXPLAIN QUERY PLAN for a SLOW_QUERIES entry, looked up on first use and kept on the entry."""
+    if entry["plan"] is None:
+        sql = entry["sql"]
+        if not sql.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")):
+            entry["plan"] = ""
+            return ""
+        from .db import get_conn
+        try:
+            with get_conn() as conn:
+                rows = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, entry["params"]).fetchall()
+            entry["plan"] = "\n".join(r[3] for r in rows)
+        except sqlite3.Error as e:
+            entry["plan"] = f"(plan unavailable: {e})"
+    return entry["plan"]
+
+
+# ----------------- Page renders -----------------
+class page_render:
+    """with page_render("Attendance"): ... -> records query count / time for one script run."""
+
+    def __init__(self, page: str):
+        self.page = page
+
+    def __enter__(self):
+        _local.render = {"page": self.page, "queries": 0, "ms": 0.0, "functions": Counter(),
+                         "started": time.perf_counter()}
+        return _local.render
+
+    def __exit__(self, *exc):
+        render, _local.render = _local.render, None
+        wall_ms = (time.perf_counter() - render.pop("started")) * 1000
+        RENDERS.append({
+            "at": time.strftime("%Y-%m-%d %H:%M:%S"), "page": render["page"],
+            "queries": render["queries"], "db_ms": round(render["ms"], 1), "wall_ms": round(wall_ms, 1),
+            "top": ", ".join(f"{f} x{n}" for f, n in render["functions"].most_common(3)),
+        })
+        return False
+
+
+# ----------------- Reporting -----------------
+def function_stats():
+    with _lock:
+        items = [(k, dict(v)) for k, v in FUNCTION_STATS.items()]
+    return sorted(({"function": k, **v, "avg_ms": v["ms"] / v["calls"] if v["calls"] else 0.0} for k, v in items),
+                  key=lambda r: r["ms"], reverse=True)
+
+
+def statement_stats():
+    with _lock:
+        items = [(k, dict(v)) for k, v in STATEMENT_STATS.items()]
+    return sorted(({"sql": k, **v, "avg_ms": v["ms"] / v["calls"] if v["calls"] else 0.0} for k, v in items),
+                  key=lambda r: r["ms"], reverse=True)
+
+
+def reset():
+    with _lock:
+        FUNCTION_STATS.clear()
+        STATEMENT_STATS.clear()
+    SLOW_QUERIES.clear()
+    RENDERS.clear()
@@ -0,0 +1,115 @@
+"""
+EXPLAIN QUERY PLAN check for the hot read paths in utils/models.py.
+
+Runs each function below against a throw-away copy of the database,
+captures every SELECT it issues and fails if SQLite plans a full table scan
+on any table. Run with:  python -m utils.query_plans
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+
+from . import db
+from . import models
+from .migrations import migrate
+
+# function name -> sample arguments
+HOT_PATHS = {
+    "list_courses_for_level": ("ND1",),
+    "student_enrollments": (1, "2024/2025", "First"),
+    "get_scores": (1,),
+    "percentage_attendance": (1, 1),
+    "list_students_in_course": (1, "2024/2025", "First"),
+    "get_user_id_by_email": ("stud1@example.com",),
+    "attendance_summary": (1,),
+    "get_user_by_matric": ("23/021/01/P/0001",),
+    "get_attendance": (1,),
+    "course_attendance_pivot": (1, "2024/2025", "First"),
+    "course_attendance_matrix": (1, "2024/2025", "First"),
+    "list_resources_for_course": ("COM 111",),
+    "list_lecturer_courses": (2, "2024/2025", "First"),
+    "list_all_courses": ("2024/2025", "First"),
+    "get_notification_feed": (1, None, 20),
+    "unread_notification_count": (1,),
+    "get_messages_after": (1, 0),
+    "get_messages_before": (1, None),
+    "get_user_matric_by_email": ("stud1@example.com",),
+    "list_courses_for_lecturer": (2, "2024/2025", "First"),
+    "get_recent_notifications": (1, 3),
+    "get_course_ids": (2, "2024/2025", "First"),
+    "count_users_by_role": ("student",),
+    "get_user_by_email": ("stud1@example.com",),
+    "calculate_gpa": (1, "2024/2025", "First"),
+    "get_course_by_code": ("COM 111",),
+    "list_course_students": (1, "2024/2025", "First"),
+    "list_course_lecturers": (1, "2024/2025", "First"),
+    "get_all_lecturers": (),
+    "get_course_id_by_code": ("COM 111",),
+    "get_user_profile": (1,),
+    "get_user_settings": (1,),
+    "risk_flags_for_lecturer": (2, "2024/2025", "First"),
+    "risk_flags_for_student": (1, "2024/2025", "First"),
+    "course_gradebook": (1, "2024/2025", "First", "test"),
+}
+
+
+def _full_scans(conn, sql):
+    """Return the plan lines that walk a whole table or index."""
+    plan = conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+    # "SCAN m" over a MATERIALIZE'd subquery reads its (already indexed) result, not a table
+    materialized = {"SCAN " + row[3].split(" ", 1)[1] for row in plan if row[3].startswith("MATERIALIZE ")}
+    return [
+        row[3] for row in plan
+        if row[3].startswith("SCAN ") and not row[3].startswith(("SCAN (", "SCAN CONSTANT ROW"))
+        and row[3] not in materialized
+    ]
+
+
+def check_query_plans(source_path: str = None):
+    """Return {function: [offending plan lines]} for every hot path that scans."""
+    source_path = source_path or db.DB_PATH
+    old_path = db.DB_PATH
+    fd, tmp_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    problems = {}
+    try:
+        src = sqlite3.connect(source_path)
+        dst = sqlite3.connect(tmp_path)
+        src.backup(dst)
+        src.close()
+        dst.close()
+
+        db.configure(path=tmp_path)
+        migrate(force=True)
+        for name, args in HOT_PATHS.items():
+            statements = []
+            with db.get_conn() as conn:
+                # nested get_conn() calls inside the function share this connection
+                conn.set_trace_callback(statements.append)
+                fn = getattr(models, name)
+                try:
+                    getattr(fn, "uncached", fn)(*args)  # bypass utils.cache so the SQL runs
+                finally:
+                    conn.set_trace_callback(None)
+                for sql in statements:
+                    if sql.lstrip().upper().startswith(("SELECT", "WITH")):
+                        scans = _full_scans(conn, sql)
+                        if scans:
+                            problems.setdefault(name, []).extend(scans)
+                conn.rollback()
+    finally:
+        db.configure(path=old_path)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(tmp_path + suffix):
+                os.remove(tmp_path + suffix)
+    return problems
+
+
+if __name__ == "__main__":
+    problems = check_query_plans()
+    for name, scans in problems.items():
+        print(f"FULL SCAN in {name}: {'; '.join(scans)}")
+    if problems:
+        sys.exit(1)
+    print(f"OK: {len(HOT_PATHS)} hot paths use indexes.")
@@ -1,7 +1,27 @@
 import streamlit as st
+from .identity import UserRecord, generation, load_user
+
+
+def current_user():
+    """The session's UserRecord (reloaded only if it was invalidated), or None."""
+    user = st.session_state.get("user")
+    if user is None:
+        return None
+    if not isinstance(user, UserRecord):  # session created before records existed
+        user = UserRecord(id=user["id"], email=user["email"], full_name=user["full_name"],
+                          role=user["role"], generation=-1)
+    if user.generation != generation(user.id):
+        user = load_user(user.id)
+        if user is None:  # account deleted
+            st.session_state.pop("user", None)
+            return None
+    st.session_state["user"] = user
+    return user
+
 
 def require_login():
-    if "user" not in st.session_state:
+    # refreshes the cached user record if it was invalidated; no query otherwise
+    if current_user() is None:
         st.switch_page("app.py")
 
 def allow_roles(*roles):
@@ -0,0 +1,127 @@
+"""
+Early-warning ("at-risk") batch scan.
+
+One pass over every enrollment of a term flags:
+  - attendance below ATTENDANCE_WARNING / ATTENDANCE_CRITICAL (attendance_rollup),
+  - failing continuous-assessment averages (test + assignment scores),
+  - projected GPA well below the previous term GPA (utils/forecast.py).
+Results replace the term's rows in risk_flags and each lecturer gets one
+summary notification. GPA-drop flags are per term (course_id NULL) and reach
+the lecturers of every course the student is enrolled in. Dashboards read
+the stored flags.
+
+    python -m utils.risk 2024/2025 First
+"""
+import sys
+
+from .db import get_conn
+from . import forecast
+
+ATTENDANCE_WARNING = 75.0
+ATTENDANCE_CRITICAL = 50.0
+CA_FAIL = 40.0            # below letter_point()'s lowest passing band
+GPA_DROP_WARNING = 0.5
+GPA_DROP_CRITICAL = 1.0
+
+
+def _enrollment_stats(conn, session, semester):
+    return conn.execute("""
+        SELECT e.student_id, e.course_id, r.total, r.present,
+               (SELECT AVG(s.score) FROM scores s
+                WHERE s.student_id = e.student_id AND s.course_id = e.course_id
+                  AND s.component <> 'exam') AS ca_avg
+        FROM enrollments e
+        LEFT JOIN attendance_rollup r ON r.student_id = e.student_id AND r.course_id = e.course_id
+        WHERE e.session=? AND e.semester=?
+    """, (session, semester)).fetchall()
+
+
+def _gpa_drop_flags(session, semester):
+    model = forecast.load_model()
+    if model is None:
+        return []
+    df = forecast.term_features(session, semester)
+    df = df[df["has_prev_gpa"] > 0]
+    if df.empty:
+        return []
+    projected = forecast.predict(df[forecast.FEATURES].to_numpy(dtype=float), model)
+    flags = []
+    for sid, prev, proj in zip(df["student_id"], df["prev_gpa"], projected):
+        drop = float(prev) - float(proj)
+        if drop >= GPA_DROP_WARNING:
+            severity = "critical" if drop >= GPA_DROP_CRITICAL else "warning"
+            flags.append((int(sid), None, "gpa_drop", severity, round(float(proj), 2), float(prev)))
+    return flags
+
+
+def scan(session: str, semester: str):
+    """Compute flags for a term without writing them: [(student_id, course_id, kind, severity, value, threshold)]."""
+    flags = []
+    with get_conn() as conn:
+        rows = _enrollment_stats(conn, session, semester)
+    for r in rows:
+        if r["total"]:
+            pct = r["present"] * 100.0 / r["total"]
+            if pct < ATTENDANCE_WARNING:
+                severity = "critical" if pct < ATTENDANCE_CRITICAL else "warning"
+                flags.append((r["student_id"], r["course_id"], "attendance", severity, round(pct, 1), ATTENDANCE_WARNING))
+        if r["ca_avg"] is not None and r["ca_avg"] < CA_FAIL:
+            flags.append((r["student_id"], r["course_id"], "ca", "critical", round(r["ca_avg"], 1), CA_FAIL))
+    return flags + _gpa_drop_flags(session, semester)
+
+
+def run_risk_scan(session: str, semester: str, notify: bool = True) -> int:
+    """
+    Scan a term, replace its risk_flags rows and send each lecturer of a
+    flagged course one coalesced notification. Returns the number of flags.
+    """
+    flags = scan(session, semester)
+    with get_conn() as conn:
+        conn.execute("DELETE FROM risk_flags WHERE session=? AND semester=?", (session, semester))
+        conn.executemany("""
+            INSERT INTO risk_flags (student_id, course_id, session, semester, kind, severity, value, threshold)
+            VALUES (?,?,?,?,?,?,?,?)
+        """, [(sid, cid, session, semester, kind, sev, val, thr) for sid, cid, kind, sev, val, thr in flags])
+
+        if notify and flags:
+            # term-level flags (GPA drop) count towards each course the student is enrolled in
+            per_lecturer = conn.execute("""
+                WITH flagged AS (
+                    SELECT student_id, course_id FROM risk_flags
+                    WHERE session=:session AND semester=:semester AND course_id IS NOT NULL
+                    UNION
+                    SELECT f.student_id, e.course_id FROM risk_flags f
+                    JOIN enrollments e ON e.student_id = f.student_id
+                         AND e.session = f.session AND e.semester = f.semester
+                    WHERE f.session=:session AND f.semester=:semester AND f.course_id IS NULL
+                )
+                SELECT lc.lecturer_id, c.code, COUNT(DISTINCT fl.student_id) AS students
+                FROM flagged fl
+                JOIN lecturer_courses lc ON lc.course_id = fl.course_id
+                     AND lc.session=:session AND lc.semester=:semester
+                JOIN courses c ON c.id = fl.course_id
+                GROUP BY lc.lecturer_id, c.code
+                ORDER BY lc.lecturer_id, c.code
+            """, {"session": session, "semester": semester}).fetchall()
+            messages = {}
+            for r in per_lecturer:
+                messages.setdefault(r["lecturer_id"], []).append(f"{r['code']}: {r['students']} student(s)")
+            conn.executemany("""
+                INSERT INTO notifications (title, message, user_id, course_id)
+                VALUES (?, ?, ?, NULL)
+            """, [(
+                f"At-risk students ({session} {semester})",
+                "Students flagged for low attendance, failing CA or a projected GPA drop — " + "; ".join(lines)
+                + ". See your dashboard for details.",
+                lecturer_id,
+            ) for lecturer_id, lines in messages.items()])
+    return len(flags)
+
+
+if __name__ == "__main__":
+    session, semester = (sys.argv[1:3] + [None, None])[:2]
+    if not session or not semester:
+        sys.exit("usage: python -m utils.risk <session> <semester>")
+    from .migrations import migrate
+    migrate()
+    print(f"{run_risk_scan(session, semester)} risk flag(s) written.")